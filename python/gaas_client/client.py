@@ -14,10 +14,13 @@
 
 from functools import wraps
 from collections.abc import Sequence
-import pickle
 
 from gaas_client import defaults
-from gaas_client.types import ValueWrapper, GraphVertexEdgeID
+from gaas_client.types import (
+    ValueWrapper,
+    GraphVertexEdgeID,
+    ndarray_from_bytes,
+)
 from gaas_client.gaas_thrift import create_client
 
 
@@ -26,7 +29,8 @@ class GaasClient:
     Client object for GaaS, which defines the API that clients can use to access
     the GaaS server.
     """
-    def __init__(self, host=defaults.host, port=defaults.port):
+    def __init__(self, host=defaults.host, port=defaults.port,
+                 protocol=defaults.protocol):
         """
         Creates a connection to a GaaS server running on host/port.
 
@@ -38,6 +42,11 @@ class GaasClient:
         port : int, defaults to 9090
             Port number where the GaaS server is listening
 
+        protocol : string, defaults to "binary"
+            Thrift protocol used to communicate with the server, either
+            "binary" or "compact". This must match the protocol the server was
+            started with.
+
         Returns
         -------
         GaasClient object
@@ -49,11 +58,13 @@ class GaasClient:
         """
         self.host = host
         self.port = port
+        self.protocol = protocol
         self.__client = None
 
-        # If True, do not automatically close a server connection upon
-        # completion or error of a server API call. This requires the caller to
-        # manually call close() when done.
+        # If True, keep the pooled client obtained by open() after a server API
+        # call completes or errors rather than releasing it, until close() is
+        # called. Each server call still uses a connection from the shared
+        # pool, so this does not pin a single connection to the server.
         self.hold_open = False
 
     def __del__(self):
@@ -61,12 +72,15 @@ class GaasClient:
 
     def __server_connection(method):
         """
-        Decorator for methods that require a connection to the server to be
-        created prior to calling a server function, then closed upon completion
-        or error. If self.hold_open is True, the automatic call to close() will
-        not take place, allowing for multiple subsequent server calls to be made
-        using the same connection. self.hold_open therefore requires the caller
-        to manually call close() in order to allow other clients to connect.
+        Decorator for methods that make server calls, which calls open() prior
+        to calling the method, then close() upon completion or error. If
+        self.hold_open is True, the automatic call to close() will not take
+        place, and the caller must manually call close() when done.
+
+        Server calls are made on connections from a pool shared by all clients
+        for the same server and settings (see gaas_thrift.create_client()):
+        each call uses an idle pooled connection, or opens a new one if none
+        are idle, and returns it to the pool when the call returns.
         """
         @wraps(method)
         def wrapped_method(self, *args, **kwargs):
@@ -81,22 +95,24 @@ class GaasClient:
 
     def open(self, call_timeout=900000):
         """
-        Opens a connection to the server at self.host/self.port if one is not
-        already established. close() must be called in order to allow other
-        connections from other clients to be made.
+        Gets a client for making calls on the server at self.host/self.port,
+        using the connection pool shared by all clients for the same server,
+        protocol and call_timeout, if one has not already been obtained. This
+        does not itself open a connection: connections are opened by server
+        calls when the pool has no idle connection to reuse.
 
-        This call does nothing if a connection to the server is already open.
+        This call does nothing if a client has already been obtained.
 
         Note: all APIs that access the server will call this method
         automatically, followed automatically by a call to close(), so calling
         this method should not be necessary. close() is not automatically called
-        if self.hold_open is False.
+        if self.hold_open is True.
 
         Parameters
         ----------
         call_timeout : int (default is 900000)
-            Time in millisecods that calls to the server using this open
-            connection must return by.
+            Time in milliseconds that calls to the server made using this client
+            must return by.
 
         Returns
         -------
@@ -106,21 +122,26 @@ class GaasClient:
         --------
         >>> from gaas_client import GaasClient
         >>> client = GaasClient()
-        >>> # Manually open a connection. The connection is held open and other
-        >>> # clients cannot connect until a client API call completes or
-        >>> # close() is manually called.
+        >>> # Manually get a pooled client. The client is kept until a client API
+        >>> # call completes (if client.hold_open is False) or close() is
+        >>> # manually called.
         >>> client.open()
 
         """
         if self.__client is None:
             self.__client = create_client(self.host, self.port,
-                                          call_timeout=call_timeout)
+                                          call_timeout=call_timeout,
+                                          protocol=self.protocol)
 
     def close(self):
         """
-        Closes a connection to the server if one has been established, allowing
-        other clients to access the server. This method is called automatically
-        for all APIs that access the server if self.hold_open is False.
+        Releases the pooled client obtained by open(), if any. This does not
+        close connections to the server: idle connections stay in the shared
+        pool for reuse by subsequent calls from any client, and are closed by a
+        background thread once they have been idle for the pool's idle_timeout
+        (30 seconds by default, see gaas_thrift.create_client()). This method
+        is called automatically for all APIs that access the server if
+        self.hold_open is False.
 
         Parameters
         ----------
@@ -134,12 +155,12 @@ class GaasClient:
         --------
         >>> from gaas_client import GaasClient
         >>> client = GaasClient()
-        >>> # Have the client hold open the connect automatically opened as part
-        >>> # of a server API call until close() is called. This is normally not
-        >>> # necessary and shown here for demonstration purposes.
+        >>> # Have the client keep the pooled client automatically obtained as
+        >>> # part of a server API call until close() is called. This is
+        >>> # normally not necessary and shown here for demonstration purposes.
         >>> client.hold_open = True
         >>> client.node2vec([0,1], 2)
-        >>> # close the connection so other clients can connect
+        >>> # release the pooled client now that it is no longer needed
         >>> client.close()
         >>> # go back to automatic open/close mode (safer)
         >>> client.hold_open = False
@@ -269,16 +290,16 @@ class GaasClient:
         *func_args : string, int, list, dictionary (optional)
             The positional args to pass to func_name. Note that func_args are
             converted to their string representation using repr() on the client,
-            then restored to python objects on the server using eval(), and
-            therefore only objects that can be restored server-side with eval()
-            are supported.
+            then restored to python objects on the server using
+            ast.literal_eval(), and therefore only literals (strings, bytes,
+            numbers, tuples, lists, dicts, sets, bools, and None) are supported.
 
         **func_kwargs : string, int, list, dictionary
             The keyword args to pass to func_name. Note that func_kwargs are
             converted to their string representation using repr() on the client,
-            then restored to python objects on the server using eval(), and
-            therefore only objects that can be restored server-side with eval()
-            are supported.
+            then restored to python objects on the server using
+            ast.literal_eval(), and therefore only literals (strings, bytes,
+            numbers, tuples, lists, dicts, sets, bools, and None) are supported.
 
         Returns
         -------
@@ -718,6 +739,10 @@ class GaasClient:
 
         Returns
         -------
+        numpy.ndarray
+            A 2D array of the requested rows, with one column per property.
+            Arrays of numeric or bool data are read-only, since they use the
+            data received from the server as their buffer.
 
         Examples
         --------
@@ -738,7 +763,7 @@ class GaasClient:
                 property_keys or []
             )
 
-        return pickle.loads(ndarray_bytes)
+        return ndarray_from_bytes(ndarray_bytes)
 
 
     @__server_connection
@@ -767,6 +792,10 @@ class GaasClient:
 
         Returns
         -------
+        numpy.ndarray
+            A 2D array of the requested rows, with one column per property.
+            Arrays of numeric or bool data are read-only, since they use the
+            data received from the server as their buffer.
 
         Examples
         --------
@@ -787,7 +816,7 @@ class GaasClient:
                 property_keys or []
             )
 
-        return pickle.loads(ndarray_bytes)
+        return ndarray_from_bytes(ndarray_bytes)
 
     @__server_connection
     def is_vertex_property(self, property_key, graph_id=defaults.graph_id):
@@ -842,15 +871,11 @@ class GaasClient:
                                                                      radius,
                                                                      graph_id)
 
-        # FIXME: ensure dtypes are correct for values returned from cugraph.batched_ego_graphs() in gaas_handler.py
-        #return (numpy.frombuffer(batched_ego_graphs_result.src_verts, dtype="int32"),
-        #        numpy.frombuffer(batched_ego_graphs_result.dst_verts, dtype="int32"),
-        #        numpy.frombuffer(batched_ego_graphs_result.edge_weights, dtype="float64"),
-        #        numpy.frombuffer(batched_ego_graphs_result.seeds_offsets, dtype="int64"))
-        return (batched_ego_graphs_result.src_verts,
-                batched_ego_graphs_result.dst_verts,
-                batched_ego_graphs_result.edge_weights,
-                batched_ego_graphs_result.seeds_offsets)
+        return self.__get_result_arrays(batched_ego_graphs_result,
+                                        ["src_verts",
+                                         "dst_verts",
+                                         "edge_weights",
+                                         "seeds_offsets"])
 
     @__server_connection
     def node2vec(self, start_vertices, max_depth, graph_id=defaults.graph_id):
@@ -870,6 +895,9 @@ class GaasClient:
 
         Returns
         -------
+        (vertex_paths, edge_weights, path_sizes) : tuple of read-only numpy
+            arrays, with the dtypes of the vertex IDs, edge weights, and path
+            sizes computed by the server
 
         Examples
         --------
@@ -877,8 +905,7 @@ class GaasClient:
         """
         # FIXME: finish docstring above
 
-        # start_vertices must be a list (cannot just be an iterable), and assume
-        # return value is tuple of python lists on host.
+        # start_vertices must be a list (cannot just be an iterable)
         if not isinstance(start_vertices, list):
             start_vertices = [start_vertices]
         # FIXME: ensure list is a list of int32, since Thrift interface
@@ -886,9 +913,10 @@ class GaasClient:
         node2vec_result = self.__client.node2vec(start_vertices,
                                                  max_depth,
                                                  graph_id)
-        return (node2vec_result.vertex_paths,
-                node2vec_result.edge_weights,
-                node2vec_result.path_sizes)
+        return self.__get_result_arrays(node2vec_result,
+                                        ["vertex_paths",
+                                         "edge_weights",
+                                         "path_sizes"])
 
     @__server_connection
     def uniform_neighbor_sample(self,
@@ -897,8 +925,7 @@ class GaasClient:
                                 with_replacement=True,
                                 graph_id=defaults.graph_id):
         """
-        Samples the graph and returns the graph id of the sampled
-        graph.
+        Samples the graph and returns the sampled edges.
 
         Parameters:
         start_list: list[int]
@@ -911,16 +938,21 @@ class GaasClient:
 
         Returns
         -------
-        The graph id of the sampled graph.
+        A tuple of numpy arrays (sources, destinations, indices) describing
+        the sampled edges.
 
         """
 
-        return self.__client.uniform_neighbor_sample(
+        result = self.__client.uniform_neighbor_sample(
             start_list,
             fanout_vals,
             with_replacement,
             graph_id,
         )
+        return self.__get_result_arrays(result,
+                                        ["sources",
+                                         "destinations",
+                                         "indices"])
 
     @__server_connection
     def pagerank(self, graph_id=defaults.graph_id):
@@ -950,3 +982,14 @@ class GaasClient:
         else:
             vert_edge_id_obj = GraphVertexEdgeID(int32_id=id_or_ids)
         return vert_edge_id_obj
+
+    @staticmethod
+    def __get_result_arrays(result, field_names):
+        """
+        Returns a tuple of the arrays in the binary fields named in field_names
+        of the algo result struct result. The arrays are read-only numpy arrays
+        backed directly by the bytes received from the server (no copy is
+        made).
+        """
+        return tuple(ndarray_from_bytes(getattr(result, field_name))
+                     for field_name in field_names)
@@ -15,3 +15,5 @@
 host = "localhost"
 port = 9090
 graph_id = 0
+protocol = "binary"
+client_timeout = 90000
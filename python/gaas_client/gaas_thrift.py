@@ -13,18 +13,72 @@
 # limitations under the License.
 
 import io
+import select
+import socket
+import threading
+import time
 
 import thriftpy2
-from thriftpy2.rpc import make_client
-from thriftpy2.protocol import TBinaryProtocolFactory
-from thriftpy2.server import TSimpleServer
-from thriftpy2.thrift import TProcessor
+from thriftpy2.protocol.compact import TCompactProtocol, TCompactProtocolFactory
+from thriftpy2.server import TThreadedServer
+from thriftpy2.thrift import TApplicationException, TClient, TProcessor
 from thriftpy2.transport import (
-    TBufferedTransportFactory,
     TServerSocket,
+    TSocket,
     TTransportException,
 )
 
+# Use the Cython-compiled protocol and transport implementations when they are
+# available, since (de)serializing the binary payloads returned by the server
+# is significantly faster than with the pure-Python versions. thriftpy2 only
+# builds the Cython extensions on some platforms, so fall back to the
+# pure-Python versions in order to still work everywhere else.
+#
+# The framed transport is used since each message is prefixed with its length,
+# allowing an entire message (such as a large graph data payload) to be read
+# with as few reads as possible. The server and its clients must use the same
+# transport.
+try:
+    from thriftpy2.protocol.cybin import (
+        TCyBinaryProtocolFactory as TBinaryProtocolFactory
+    )
+    from thriftpy2.transport.framed import (
+        TCyFramedTransportFactory as TFramedTransportFactory
+    )
+except ImportError:
+    from thriftpy2.protocol.binary import TBinaryProtocolFactory
+    from thriftpy2.transport.framed import TFramedTransportFactory
+
+
+class _CompactProtocol(TCompactProtocol):
+    """
+    TCompactProtocol which accepts the same binary values as the binary
+    protocol (bytes, bytearray, or a memoryview with format "B").
+    TCompactProtocol passes binary values directly to the transport, and the
+    Cython framed transport only accepts bytes, so other objects are converted
+    to bytes here.
+    """
+    def _write_binary(self, b):
+        if not isinstance(b, (bytes, str)):
+            b = bytes(b)
+        super()._write_binary(b)
+
+
+class _CompactProtocolFactory(TCompactProtocolFactory):
+    def get_protocol(self, trans):
+        return _CompactProtocol(trans, decode_response=self.decode_response,
+                                strict_decode=self.strict_decode)
+
+
+# The Thrift protocols supported by the server and clients. The server and its
+# clients must use the same protocol. "binary" is the default since it uses the
+# Cython implementation (if available), while "compact" produces smaller
+# messages for integer-heavy data (variable-length int encoding) at the cost of
+# a pure-Python implementation.
+protocol_factories = {"binary": TBinaryProtocolFactory,
+                      "compact": _CompactProtocolFactory,
+                      }
+
 
 # This is the Thrift input file as a string rather than a separate file. This
 # allows the Thrift input to be contained within the module that's responsible
@@ -44,25 +98,30 @@ exception GaasError {
   1:string message
 }
 
+# The binary fields in BatchedEgoGraphsResult, Node2vecResult, and
+# UniformNeighborSampleResult are arrays serialized by
+# gaas_client.types.ndarray_to_bytes() (a header with the dtype and shape
+# followed by the raw array data), which allows them to be (de)serialized in
+# bulk rather than one element at a time while keeping the server's dtypes.
 struct BatchedEgoGraphsResult {
-  1:list<i32> src_verts
-  2:list<i32> dst_verts
-  3:list<double> edge_weights
-  4:list<i32> seeds_offsets
+  1:binary src_verts
+  2:binary dst_verts
+  3:binary edge_weights
+  4:binary seeds_offsets
 }
 
 struct Node2vecResult {
-  1:list<i32> vertex_paths
-  2:list<double> edge_weights
-  3:list<i32> path_sizes
+  1:binary vertex_paths
+  2:binary edge_weights
+  3:binary path_sizes
 }
 
 # FIXME: uniform_neighbor_sample may need to return indices as ints
 # See: https://github.com/rapidsai/cugraph/issues/2654
 struct UniformNeighborSampleResult {
-  1:list<i32> sources
-  2:list<i32> destinations
-  3:list<double> indices
+  1:binary sources
+  2:binary destinations
+  3:binary indices
 }
 
 union GraphVertexEdgeID {
@@ -147,6 +206,11 @@ service GaasService {
                        8:i32 graph_id
                        ) throws (1:GaasError e),
 
+  # The binary returned by get_graph_vertex_data() and get_graph_edge_data()
+  # is a 2D numpy array of the requested rows (one column per property),
+  # serialized by gaas_client.types.ndarray_to_bytes(): a small header with
+  # the dtype and shape followed by the raw array data, or a pickle for
+  # arrays of objects (eg. string properties).
   binary get_graph_vertex_data(1:GraphVertexEdgeID vertex_id,
                                2:Value null_replacement_value,
                                3:i32 graph_id,
@@ -154,7 +218,7 @@ service GaasService {
                                ) throws (1:GaasError e),
 
   binary get_graph_edge_data(1:GraphVertexEdgeID edge_id,
-                             2:Value null_replacement_value
+                             2:Value null_replacement_value,
                              3:i32 graph_id,
                              4:list<string> property_keys
                              ) throws (1:GaasError e),
@@ -199,7 +263,55 @@ service GaasService {
 spec = thriftpy2.load_fp(io.StringIO(gaas_thrift_spec),
                          module_name="gaas_thrift")
 
-def create_server(handler, host, port, client_timeout=90000):
+
+def _get_protocol_factory(protocol):
+    """
+    Return a new protocol factory instance for the protocol name, raising
+    ValueError if protocol is not supported.
+    """
+    factory_class = protocol_factories.get(protocol)
+    if factory_class is None:
+        raise ValueError(f"protocol must be one of {list(protocol_factories)}, "
+                         f"got {protocol!r}")
+    return factory_class()
+
+
+class _ClientSocket(TSocket):
+    """
+    TSocket for a client connection accepted by the server, which treats a
+    read timeout as the client closing the connection.
+    """
+    def read(self, sz):
+        try:
+            return super().read(sz)
+        except socket.timeout:
+            # The client did not send a request within client_timeout (eg. an
+            # idle pooled connection), so close the connection the same way as
+            # one closed by the client instead of logging a traceback.
+            raise TTransportException(type=TTransportException.TIMED_OUT,
+                                      message="client connection timed out")
+
+
+class _ServerSocket(TServerSocket):
+    """
+    TServerSocket which configures each accepted client connection for
+    request/reply RPC traffic.
+    """
+    def accept(self):
+        (client_sock, _) = self.sock.accept()
+        if self.client_timeout:
+            client_sock.settimeout(self.client_timeout)
+        # Disable Nagle's algorithm so small replies (uptime(), get_graph_ids(),
+        # etc.) are sent immediately instead of being delayed waiting for more
+        # data, and enable keepalive so connections to clients that have gone
+        # away are eventually detected and closed.
+        client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client_sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return _ClientSocket(sock=client_sock)
+
+
+def create_server(handler, host, port, client_timeout=90000,
+                  protocol="binary"):
     """
     Return a server object configured to listen on host/port and use the handler
     object to handle calls from clients. The handler object must have an
@@ -210,21 +322,183 @@ def create_server(handler, host, port, client_timeout=90000):
     to the Thrift spec loaded here on import, and to keep all thriftpy2 calls in
     this module. However, this function is likely only called from the
     gaas_server package which depends on the code in this package.
+
+    protocol is the name of the Thrift protocol to use (see
+    protocol_factories), and must match the protocol used by clients.
+
+    client_timeout is the time in milliseconds the server waits for the next
+    request on an open client connection before closing it. It does not limit
+    how long the handler may take to complete a call.
     """
-    proto_factory = TBinaryProtocolFactory()
-    trans_factory = TBufferedTransportFactory()
-    client_timeout = client_timeout
+    proto_factory = _get_protocol_factory(protocol)
+    trans_factory = TFramedTransportFactory()
 
     processor = TProcessor(spec.GaasService, handler)
-    server_socket = TServerSocket(host=host, port=port,
+    server_socket = _ServerSocket(host=host, port=port,
                                   client_timeout=client_timeout)
-    server = TSimpleServer(processor, server_socket,
-                           iprot_factory=proto_factory,
-                           itrans_factory=trans_factory)
+    # Serve each client connection in its own thread so that a long-running
+    # call from one client does not block calls from other clients. Use daemon
+    # threads so Ctrl-C is not blocked by connections that are still open.
+    server = TThreadedServer(processor, server_socket,
+                             iprot_factory=proto_factory,
+                             itrans_factory=trans_factory,
+                             daemon=True)
     return server
 
 
-def create_client(host, port, call_timeout=90000):
+class _ConnectionPool:
+    """
+    A pool of open client connections to a single server, shared by all clients
+    created by create_client() for the same host/port/options. Reusing open
+    connections avoids the cost of establishing a new TCP connection for each
+    server API call.
+    """
+    def __init__(self, host, port, call_timeout, connect_timeout, protocol,
+                 pool_size, idle_timeout):
+        """
+        call_timeout and connect_timeout are in milliseconds, idle_timeout is in
+        seconds.
+        """
+        self.host = host
+        self.port = port
+        self.call_timeout = call_timeout
+        self.connect_timeout = connect_timeout
+        self.protocol = protocol
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        # (connection, time last returned to the pool) tuples, the most recently
+        # used connection is at the end.
+        self.__idle = []
+        self.__lock = threading.Lock()
+        # Thread which closes expired idle connections, started when the first
+        # connection is returned to the pool.
+        self.__sweeper = None
+
+    def checkout(self):
+        """
+        Return an open (TClient, TSocket) connection, either an idle one from
+        the pool or a newly opened one if no usable idle connections are
+        available.
+        """
+        while True:
+            with self.__lock:
+                self.__close_expired()
+                if not self.__idle:
+                    break
+                (conn, _) = self.__idle.pop()
+            if self.__is_usable(conn):
+                return conn
+            conn[0].close()
+
+        return self.__connect()
+
+    def checkin(self, conn):
+        """
+        Return conn to the pool of idle connections, or close it if the pool is
+        full.
+        """
+        with self.__lock:
+            self.__close_expired()
+            if len(self.__idle) < self.pool_size:
+                self.__idle.append((conn, time.monotonic()))
+                if self.__sweeper is None:
+                    self.__sweeper = threading.Thread(target=self.__sweep,
+                                                      daemon=True)
+                    self.__sweeper.start()
+                return
+        conn[0].close()
+
+    def __connect(self):
+        # This is equivalent to thriftpy2.rpc.make_client(), but also returns
+        # the underlying socket so its state can be checked prior to reusing
+        # the connection.
+        sock = TSocket(self.host, self.port,
+                       socket_timeout=self.call_timeout,
+                       connect_timeout=self.connect_timeout)
+        transport = TFramedTransportFactory().get_transport(sock)
+        protocol = _get_protocol_factory(self.protocol).get_protocol(transport)
+        transport.open()
+        return (TClient(spec.GaasService, protocol), sock)
+
+    def __sweep(self):
+        # Close idle connections once they expire, even if the pool is not
+        # used again, so they are not left open until the server times them
+        # out. Expired connections are closed at most a quarter of
+        # idle_timeout after expiring.
+        while True:
+            time.sleep(self.idle_timeout / 4)
+            with self.__lock:
+                self.__close_expired()
+
+    def __close_expired(self):
+        # Connections idle for longer than idle_timeout are closed since the
+        # server will eventually close them anyway. Called with self.__lock
+        # held.
+        oldest_allowed = time.monotonic() - self.idle_timeout
+        while self.__idle and self.__idle[0][1] < oldest_allowed:
+            (conn, _) = self.__idle.pop(0)
+            conn[0].close()
+
+    @staticmethod
+    def __is_usable(conn):
+        # An idle connection has no reply pending, so if the socket is readable
+        # the server has closed the connection (or sent unexpected data) and it
+        # cannot be reused.
+        try:
+            (readable, _, _) = select.select([conn[1].sock], [], [], 0)
+        except (OSError, TypeError, ValueError):
+            return False
+        return not readable
+
+
+# Connection pools shared by all clients, keyed by the args to create_client()
+_connection_pools = {}
+_connection_pools_lock = threading.Lock()
+
+
+class _PooledClient:
+    """
+    Client object with the same interface as a thriftpy2 client for the
+    GaasService, which makes each call using a connection checked out from a
+    _ConnectionPool and returns the connection to the pool when the call
+    completes.
+    """
+    def __init__(self, pool):
+        self.__pool = pool
+
+    def __getattr__(self, name):
+        if name not in spec.GaasService.thrift_services:
+            raise AttributeError(name)
+        pool = self.__pool
+
+        def call(*args, **kwargs):
+            conn = pool.checkout()
+            try:
+                ret_val = getattr(conn[0], name)(*args, **kwargs)
+            except (spec.GaasError, TApplicationException):
+                # Exceptions sent by the server leave the connection usable
+                pool.checkin(conn)
+                raise
+            except BaseException:
+                # Transport errors, timeouts, etc. leave the connection in an
+                # unknown state, so do not allow it to be reused.
+                conn[0].close()
+                raise
+            pool.checkin(conn)
+            return ret_val
+
+        return call
+
+    def close(self):
+        """
+        Release this client. The connections used by it remain open in the pool
+        for use by other clients, until closed after idle_timeout.
+        """
+        pass
+
+
+def create_client(host, port, call_timeout=90000, connect_timeout=5000,
+                  protocol="binary", pool_size=8, idle_timeout=30000):
     """
     Return a client object that will make calls on a server listening on
     host/port.
@@ -232,10 +506,37 @@ def create_client(host, port, call_timeout=90000):
     The call_timeout value defaults to 90 seconds, and is used for setting the
     timeout for server API calls when using the client created here - if a call
     does not return in call_timeout milliseconds, an exception is raised.
+    connect_timeout is the time in milliseconds allowed for establishing a
+    connection to the server, which is kept separate from call_timeout so an
+    unreachable server is reported quickly even when call_timeout is large to
+    allow for long-running calls.
+
+    protocol is the name of the Thrift protocol to use (see
+    protocol_factories), and must match the protocol used by the server.
+
+    Connections to the server are pooled and shared by all clients created with
+    the same args. pool_size is the maximum number of idle connections kept
+    open, and idle_timeout is the time in milliseconds an idle connection is
+    kept open before being closed by a background thread. idle_timeout should
+    be less than the client_timeout used by the server.
     """
+    # Check the protocol name now so an invalid name raises ValueError instead
+    # of the GaasError below.
+    _get_protocol_factory(protocol)
+    pool_key = (host, port, call_timeout, connect_timeout, protocol, pool_size,
+                idle_timeout)
+    with _connection_pools_lock:
+        pool = _connection_pools.get(pool_key)
+        if pool is None:
+            pool = _ConnectionPool(host, port, call_timeout, connect_timeout,
+                                   protocol, pool_size, idle_timeout / 1000)
+            _connection_pools[pool_key] = pool
+
+    # Ensure a connection to the server can be made (or an idle one is
+    # available) before returning a client, in order to allow callers to
+    # handle an unreachable server here.
     try:
-        return make_client(spec.GaasService, host=host, port=port,
-                           timeout=call_timeout)
+        pool.checkin(pool.checkout())
     except TTransportException:
         # Raise a GaaS exception in order to completely encapsulate all Thrift
         # details in this module. If this was not done, callers of this function
@@ -251,3 +552,5 @@ def create_client(host, port, call_timeout=90000):
         # FIXME: this exception being raised could use more detail
         raise spec.GaasError("could not create a client session with a "
                              "GaaS server")
+
+    return _PooledClient(pool)
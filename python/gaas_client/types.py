@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pickle
+import struct
+
 import numpy
 
 from gaas_client.gaas_thrift import spec
@@ -22,36 +25,162 @@ BatchedEgoGraphsResult = spec.BatchedEgoGraphsResult
 Node2vecResult = spec.Node2vecResult
 UniformNeighborSampleResult = spec.UniformNeighborSampleResult
 
+# The binary fields of the result types contain arrays serialized in the
+# ndarray_to_bytes() format, so the arrays keep the dtypes they have on the
+# server.
+#
+# When creating result instances, the binary fields can be set to bytes, a
+# bytearray, or a C-contiguous memoryview with format "B" (eg.
+# memoryview(array).cast("B")). The binary protocol writes these directly from
+# their buffers, and the compact protocol converts them to bytes first (see
+# gaas_client.gaas_thrift.protocol_factories); other Thrift protocols may only
+# accept bytes. Received results always contain bytes.
+
+# Formats of the payloads created by ndarray_to_bytes(), stored in the first
+# byte of the payload.
+_ndarray_payload_raw = 0
+_ndarray_payload_pickle = 1
+
+
+def ndarray_header(dtype, shape):
+    """
+    Returns the header written by ndarray_to_bytes() before the raw data of an
+    array with the numpy dtype dtype and shape shape. This allows the server to
+    write the raw data for a device array directly after the header, in the
+    same (eg. pinned) host buffer.
+    """
+    dtype_str = numpy.dtype(dtype).str.encode("ascii")
+    return struct.pack(f"<BH{len(dtype_str)}sB{len(shape)}q",
+                       _ndarray_payload_raw,
+                       len(dtype_str), dtype_str,
+                       len(shape), *shape)
+
+
+def ndarray_to_bytes(array):
+    """
+    Returns a repr of the numpy array array, which includes its dtype and
+    shape, as bytes (pickled arrays) or a bytearray (raw arrays). Use
+    ndarray_from_bytes() to restore it.
+
+    The bytearray can be returned for a Thrift binary value when using the
+    protocols in gaas_client.gaas_thrift.protocol_factories (the compact
+    protocol converts it to bytes when writing it), but should be converted to
+    bytes for other uses that require bytes.
+
+    Arrays with a numeric, bool, datetime/timedelta, or fixed-size string
+    dtype are written as a small header (dtype and shape) followed by the raw
+    array data. Other arrays (eg. arrays of Python objects, which is what
+    cudf/pandas to_numpy() returns for string columns) are pickled instead.
+    """
+    if array.dtype.kind not in "biufcmMSU":
+        return bytes([_ndarray_payload_pickle]) + \
+            pickle.dumps(array, protocol=5)
+
+    header = ndarray_header(array.dtype, array.shape)
+    # Copy the array data into the preallocated payload using numpy, which
+    # releases the GIL during the copy (unlike bytes.join() or tobytes()) so
+    # other server threads can run while large arrays are serialized. This also
+    # gathers non-contiguous arrays in the same copy, in C order.
+    header_size = len(header)
+    payload = bytearray(header_size + array.nbytes)
+    payload[:header_size] = header
+    numpy.frombuffer(payload, dtype=array.dtype,
+                     offset=header_size).reshape(array.shape)[...] = array
+    return payload
+
+
+def ndarray_from_bytes(array_bytes):
+    """
+    Returns the numpy array from array_bytes created by ndarray_to_bytes().
+    Arrays written as raw data use array_bytes as their buffer (no copy is
+    made), so they are read-only when array_bytes is immutable (eg. bytes).
+    """
+    if array_bytes[0] == _ndarray_payload_pickle:
+        return pickle.loads(memoryview(array_bytes)[1:])
+
+    offset = 1
+    (dtype_str_len,) = struct.unpack_from("<H", array_bytes, offset)
+    offset += 2
+    (dtype_str, ndim) = struct.unpack_from(f"<{dtype_str_len}sB", array_bytes,
+                                           offset)
+    offset += dtype_str_len + 1
+    shape = struct.unpack_from(f"<{ndim}q", array_bytes, offset)
+    offset += 8 * ndim
+
+    dtype = numpy.dtype(dtype_str.decode("ascii"))
+    count = 1
+    for dim in shape:
+        count *= dim
+    return numpy.frombuffer(array_bytes, dtype=dtype, count=count,
+                            offset=offset).reshape(shape)
+
+
+def make_int_union(val):
+    """
+    Returns a Value union for the int (or numpy int) val, using the int32 member
+    when val fits in an i32 and the int64 member otherwise. This is equivalent
+    to ValueWrapper(val).union for ints, without the type dispatch.
+    """
+    val = int(val)
+    if -2147483648 <= val <= 2147483647:
+        return Value(int32_value=val)
+    return Value(int64_value=val)
+
+
+# The member names of each Thrift union type, in field ID order, taken from the
+# generated thrift_spec once rather than scanning dir() for each value.
+_union_member_names = {
+    union_type: tuple(field_spec[1] for (_, field_spec)
+                      in sorted(union_type.thrift_spec.items()))
+    for union_type in (Value, GraphVertexEdgeID)
+}
+
+
+def _get_union_value(union):
+    """
+    Return the value of the member set in the Thrift union, or None if no
+    member is set.
+    """
+    for name in _union_member_names[type(union)]:
+        val = getattr(union, name)
+        if val is not None:
+            return val
+
+    return None
+
 
 class UnionWrapper:
     """
     Provides easy conversions between py objs and Thrift "unions".
     """
-    def get_py_obj(self):
-        not_members = set(["default_spec", "thrift_spec", "read", "write"])
-        attrs = [a for a in dir(self.union)
-                    if not(a.startswith("_")) and a not in not_members]
-        for a in attrs:
-            val = getattr(self.union, a)
-            if val is not None:
-                return val
+    # Wrappers are created for each union value sent or received, so use
+    # __slots__ to avoid creating a __dict__ for each instance. The py obj for
+    # the union is stored in val when the wrapper is created, since it is
+    # already known unless the wrapper was created from a received union.
+    __slots__ = ("union", "val")
 
-        return None
+    def get_py_obj(self):
+        return self.val
 
 
 class ValueWrapper(UnionWrapper):
+    __slots__ = ()
+
     def __init__(self, val, val_name="value"):
         if isinstance(val, Value):
             self.union = val
+            val = _get_union_value(val)
         elif isinstance(val, int):
             if val < 4294967296:
                 self.union = Value(int32_value=val)
             else:
                 self.union = Value(int64_value=val)
         elif isinstance(val, numpy.int32):
-            self.union = Value(int32_value=int(val))
+            val = int(val)
+            self.union = Value(int32_value=val)
         elif isinstance(val, numpy.int64):
-            self.union = Value(int64_value=int(val))
+            val = int(val)
+            self.union = Value(int64_value=val)
         elif isinstance(val, str):
             self.union = Value(string_value=val)
         elif isinstance(val, bool):
@@ -60,12 +189,16 @@ class ValueWrapper(UnionWrapper):
             raise TypeError(f"{val_name} must be one of the "
                             "following types: [int, str, bool], got "
                             f"{type(val)}")
+        self.val = val
 
 
 class GraphVertexEdgeIDWrapper(UnionWrapper):
+    __slots__ = ()
+
     def __init__(self, val, val_name="id"):
         if isinstance(val, GraphVertexEdgeID):
             self.union = val
+            val = _get_union_value(val)
         elif isinstance(val, int):
             if val >= 4294967296:
                 self.union = GraphVertexEdgeID(int64_id=val)
@@ -81,3 +214,4 @@ class GraphVertexEdgeIDWrapper(UnionWrapper):
             raise TypeError(f"{val_name} must be one of the "
                             "following types: [int, list<int>], got "
                             f"{type(val)}")
+        self.val = val
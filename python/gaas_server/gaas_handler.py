@@ -13,12 +13,21 @@
 # limitations under the License.
 
 from pathlib import Path
+from collections import OrderedDict
+import ast
+import ctypes
+import functools
 import importlib
+import logging
+import threading
 import time
 import traceback
+import warnings
 from inspect import signature
 
 import numpy as np
+import cupy
+import cupyx
 import cudf
 import dask_cudf
 import cugraph
@@ -40,9 +49,111 @@ from gaas_client.types import (
     UniformNeighborSampleResult,
     ValueWrapper,
     GraphVertexEdgeIDWrapper,
+    make_int_union,
+    ndarray_header,
+    ndarray_to_bytes,
+    ndarray_from_bytes,
 )
 
 
+@functools.lru_cache(maxsize=1024)
+def _parse_expr(expr):
+    """
+    Returns the AST for the Python expression string expr. ASTs are cached
+    since clients often pass the same arg reprs repeatedly, and parsing is the
+    dominant cost of restoring short reprs.
+    """
+    return ast.parse(expr, mode="eval")
+
+
+def _literal_from_repr(expr):
+    """
+    Returns the Python object for expr, the repr of a literal (str, bytes,
+    number, tuple, list, dict, set, bool, or None).
+    """
+    return ast.literal_eval(_parse_expr(expr))
+
+
+logger = logging.getLogger(__name__)
+
+# The header values sent by clients to represent the non-int header args for
+# cudf.read_csv(), since the header arg is an int in the Thrift spec.
+_csv_header_values = {-1: "infer", -2: None}
+
+
+def _as_int32_series(values):
+    """
+    Returns values as an int32 cudf Series. values is returned as-is if it is
+    already an int32 Series, and device arrays (objects with a
+    __cuda_array_interface__) are converted on the device, so only host data
+    (eg. a list received from a client) is copied to the device.
+    """
+    if isinstance(values, cudf.Series) and values.dtype == "int32":
+        return values
+    if hasattr(values, "__cuda_array_interface__"):
+        return cudf.Series(cupy.asarray(values, dtype="int32"))
+    return cudf.Series(values, dtype="int32")
+
+
+def _check_int32_edge_IDs(min_edge_ID, max_edge_ID):
+    """
+    Raises GaasError if edge IDs ranging from min_edge_ID to max_edge_ID do not
+    fit in the list<i32> returned to clients, rather than allowing them to be
+    truncated.
+    """
+    int32_info = np.iinfo("int32")
+    if min_edge_ID < int32_info.min or max_edge_ID > int32_info.max:
+        raise GaasError("edge IDs must fit in an int32 to be returned, got "
+                        f"edge IDs in the range [{min_edge_ID}, "
+                        f"{max_edge_ID}]")
+
+
+def _device_columns_to_host_buffers(columns):
+    """
+    Returns a dictionary of name:memoryview containing each device column (cudf
+    Series or cupy array) in the columns dictionary serialized in the
+    gaas_client.types.ndarray_to_bytes() format, using the column's own dtype
+    so no values are truncated.
+
+    All columns are copied asynchronously to pinned host memory on one stream
+    which is synchronized once, rather than copied to pageable host memory one
+    at a time like .values_host does. Each column is copied directly after its
+    header in the same pinned buffer, and the returned memoryviews reference
+    the pinned memory directly (no additional copy to bytes objects is made
+    when using the binary protocol) and can be used as the values for the
+    binary fields of the result types, see gaas_client.types.
+    """
+    # A blocking stream (the default) is used so the copies are ordered after
+    # any work that produced the columns on the default stream.
+    stream = cupy.cuda.Stream()
+    device_arrays = []
+    host_buffers = {}
+    with stream:
+        for (name, column) in columns.items():
+            device_array = cupy.ascontiguousarray(cupy.asarray(column))
+            header = ndarray_header(device_array.dtype, device_array.shape)
+            header_size = len(header)
+            # Pinned allocations are cached and reused by cupy's pinned memory
+            # pool.
+            host_buffer = cupyx.empty_pinned(
+                header_size + device_array.nbytes, dtype="uint8")
+            host_buffer[:header_size] = np.frombuffer(header, dtype="uint8")
+            if device_array.nbytes > 0:
+                device_array.data.copy_to_host_async(
+                    ctypes.c_void_p(host_buffer.ctypes.data + header_size),
+                    device_array.nbytes,
+                    stream)
+            # Keep the device arrays alive until the copies complete.
+            device_arrays.append(device_array)
+            host_buffers[name] = host_buffer
+    stream.synchronize()
+
+    # The memoryviews keep the pinned host buffers alive until they are
+    # serialized.
+    return {name: memoryview(host_buffer)
+            for (name, host_buffer) in host_buffers.items()}
+
+
 def call_algo(sg_algo_func, G, **kwargs):
     """
     Calls the appropriate algo function based on the graph G being MG or SG. If
@@ -66,9 +177,10 @@ def call_algo(sg_algo_func, G, **kwargs):
             data = uniform_neighbor_sample(G, **kwargs_to_pass)
 
         return UniformNeighborSampleResult(
-            sources=data.sources.values_host,
-            destinations=data.destinations.values_host,
-            indices=data.indices.values_host
+            **_device_columns_to_host_buffers(
+                {"sources": data.sources,
+                 "destinations": data.destinations,
+                 "indices": data.indices})
         )
 
     else:
@@ -113,12 +225,83 @@ class GaasHandler:
     # instance for server extension functions.
     __server_facade_extension_param_name = "gaas_server"
 
+    # The names of "internal" PropertyGraph columns (ie. used for PropertyGraph
+    # bookkeeping purposes only), which are not returned to clients.
+    __internal_column_names = frozenset([PropertyGraph.vertex_col_name,
+                                         PropertyGraph.src_col_name,
+                                         PropertyGraph.dst_col_name,
+                                         PropertyGraph.type_col_name,
+                                         PropertyGraph.edge_id_col_name,
+                                         PropertyGraph.vertex_id_col_name,
+                                         PropertyGraph.weight_col_name])
+
+    # Extracted graphs with at most this many edges have a (src, dst):edge ID
+    # dictionary built on their second get_edge_IDs_for_vertices() call, which
+    # is reused for subsequent calls on the same graph. Larger graphs, and
+    # graphs queried only once, query the edge data on each call instead,
+    # since the dictionary uses a few hundred bytes of host memory per edge.
+    __edge_ID_lookup_max_edges = 100000
+    # Total number of entries in the dictionaries for all graphs. When adding a
+    # dictionary exceeds this, the least recently used ones are discarded.
+    __edge_ID_lookups_max_total_edges = 500000
+
+    # Functions to compute each get_graph_info() value for a graph with
+    # properties (PropertyGraph or MGPropertyGraph), and for a graph without
+    # properties.
+    __pg_info_funcs = {
+        "num_vertices": lambda G: G.get_num_vertices(),
+        "num_vertices_from_vertex_data":
+            lambda G: G.get_num_vertices(include_edge_data=False),
+        "num_edges": lambda G: G.get_num_edges(),
+        "num_vertex_properties": lambda G: len(G.vertex_property_names),
+        "num_edge_properties": lambda G: len(G.edge_property_names),
+    }
+    __graph_info_funcs = {
+        "num_vertices": lambda G: G.number_of_vertices(),
+        "num_vertices_from_vertex_data": lambda G: 0,
+        "num_edges": lambda G: G.number_of_edges(),
+        "num_vertex_properties": lambda G: 0,
+        "num_edge_properties": lambda G: 0,
+    }
+    __graph_info_keys = frozenset(__pg_info_funcs)
+
     def __init__(self):
         self.__next_graph_id = defaults.graph_id + 1
+        # graph ID:(graph instance, True if the graph has properties)
         self.__graph_objs = {}
+        # The server can call handler methods from multiple threads (one per
+        # client connection), so access that updates the graph ID:graph mapping
+        # must be serialized.
+        self.__graph_objs_lock = threading.Lock()
+        # graph ID:lock used to serialize access to the data of the same graph
+        # from separate client connections, since PropertyGraph is not
+        # thread-safe: calls that read a graph must not run while another call
+        # is adding data to it.
+        self.__graph_locks = {}
+        # graph ID:(src, dst):edge ID dictionary, in least to most recently
+        # used order, and the total number of entries in those dictionaries,
+        # see get_edge_IDs_for_vertices()
+        self.__edge_ID_lookups = OrderedDict()
+        self.__edge_ID_lookups_num_edges = 0
+        # graph ID:number of get_edge_IDs_for_vertices() calls for the graph
+        # (or None if the graph is too large to have a dictionary)
+        self.__edge_ID_query_counts = {}
         self.__graph_creation_extensions = {}
+        # Function name:function for all graph creation extension functions,
+        # rebuilt whenever extensions are loaded or unloaded.
+        self.__graph_creation_extension_funcs = {}
+        # Extension file path:(file modification time, module) for the
+        # extension files loaded so far, used to avoid re-executing unchanged
+        # files when extensions are loaded again.
+        self.__extension_module_cache = {}
+        # Serializes loading/unloading extensions, which update the mappings
+        # above, from separate client connections.
+        self.__graph_creation_extensions_lock = threading.Lock()
         self.__dask_client = None
         self.__dask_cluster = None
+        # The assumption is that GaaS requires at least 1 GPU (ie. currently
+        # there is no CPU-only version of GaaS)
+        self.__num_gpus = 1
         self.__start_time = int(time.time())
 
     def __del__(self):
@@ -147,14 +330,7 @@ class GaasHandler:
         "unions" used for RPC serialization.
         """
         # FIXME: expose self.__dask_client.scheduler_info() as needed
-        if self.__dask_client is not None:
-            num_gpus = len(self.__dask_client.scheduler_info()["workers"])
-        else:
-            # The assumption is that GaaS requires at least 1 GPU (ie.
-            # currently there is no CPU-only version of GaaS)
-            num_gpus = 1
-
-        return {"num_gpus": ValueWrapper(num_gpus).union}
+        return {"num_gpus": make_int_union(self.__num_gpus)}
 
     def load_graph_creation_extensions(self, extension_dir_path):
         """
@@ -164,6 +340,8 @@ class GaasHandler:
         The modules are searched and their functions are called (if a match is
         found) when call_graph_creation_extension() is called.
 
+        Files that were loaded previously and have not been modified since are
+        not re-executed, and their previously loaded module is used instead.
         """
         extension_dir = Path(extension_dir_path)
 
@@ -172,33 +350,44 @@ class GaasHandler:
 
         num_files_read = 0
 
-        for ext_file in extension_dir.glob("*_extension.py"):
-            module_name = ext_file.stem
-            spec = importlib.util.spec_from_file_location(module_name,
-                                                          ext_file)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            self.__graph_creation_extensions[module_name] = module
-            num_files_read += 1
-
+        with self.__graph_creation_extensions_lock:
+            for ext_file in extension_dir.glob("*_extension.py"):
+                module_name = ext_file.stem
+                cache_key = str(ext_file.resolve())
+                mtime = ext_file.stat().st_mtime_ns
+                cached = self.__extension_module_cache.get(cache_key)
+                if (cached is not None) and (cached[0] == mtime):
+                    module = cached[1]
+                else:
+                    spec = importlib.util.spec_from_file_location(module_name,
+                                                                  ext_file)
+                    module = importlib.util.module_from_spec(spec)
+                    spec.loader.exec_module(module)
+                    self.__extension_module_cache[cache_key] = (mtime, module)
+                self.__graph_creation_extensions[module_name] = module
+                num_files_read += 1
+
+            self.__update_graph_creation_extension_funcs()
         return num_files_read
 
     def unload_graph_creation_extensions(self):
         """
         Removes all graph creation extensions.
         """
-        self.__graph_creation_extensions.clear()
+        with self.__graph_creation_extensions_lock:
+            self.__graph_creation_extensions.clear()
+            self.__update_graph_creation_extension_funcs()
 
     def call_graph_creation_extension(self, func_name,
                                       func_args_repr, func_kwargs_repr):
         """
         Calls the graph creation extension function func_name and passes it the
-        eval'd func_args_repr and func_kwargs_repr objects.
+        objects restored from func_args_repr and func_kwargs_repr.
 
-        The arg/kwarg reprs are eval'd prior to calling in order to pass actual
-        python objects to func_name (this is needed to allow arbitrary arg
-        objects to be serialized as part of the RPC call from the
-        client).
+        The arg/kwarg reprs are restored using ast.literal_eval() prior to
+        calling in order to pass actual python objects to func_name (this is
+        needed to allow arg objects to be serialized as part of the RPC call
+        from the client). Only reprs of literals are supported.
 
         func_name cannot be a private name (name starting with __).
 
@@ -206,51 +395,79 @@ class GaasHandler:
         and the first extension module that contains it will have its function
         called.
         """
+        func = None
+        # Ignore private functions
         if not(func_name.startswith("__")):
-            for module in self.__graph_creation_extensions.values():
-                # Ignore private functions
-                func = getattr(module, func_name, None)
-                if func is not None:
-                    func_args = eval(func_args_repr)
-                    func_kwargs = eval(func_kwargs_repr)
-                    func_sig = signature(func)
-                    func_params = list(func_sig.parameters.keys())
-                    facade_param = self.__server_facade_extension_param_name
-
-                    # Graph creation extensions that have the last arg named
-                    # self.__server_facade_extension_param_name are passed a
-                    # ExtensionServerFacade instance to allow them to query the
-                    # "server" in a safe way, if needed.
-                    if (facade_param in func_params):
-                        if func_params[-1] == facade_param:
-                            func_kwargs[facade_param] = \
-                                ExtensionServerFacade(self)
-                        else:
-                            raise GaasError(f"{facade_param}, if specified, "
-                                            "must be the last param.")
-
-                    try:
-                        graph_obj = func(*func_args, **func_kwargs)
-                    except:
-                        # FIXME: raise a more detailed error
-                        raise GaasError(f"error running {func_name} : "
-                                        f"{traceback.format_exc()}")
-                    return self.__add_graph(graph_obj)
-
-        raise GaasError(f"{func_name} is not a graph creation extension")
-
-    def initialize_dask_client(self, dask_scheduler_file=None):
+            func = self.__graph_creation_extension_funcs.get(func_name)
+
+        if func is None:
+            raise GaasError(f"{func_name} is not a graph creation extension")
+
+        try:
+            func_args = _literal_from_repr(func_args_repr)
+            func_kwargs = _literal_from_repr(func_kwargs_repr)
+        except (ValueError, TypeError, SyntaxError, MemoryError,
+                RecursionError):
+            raise GaasError(f"the args passed to {func_name} must be literals "
+                            "(str, bytes, numbers, tuples, lists, dicts, "
+                            "sets, bools, or None)")
+        func_sig = signature(func)
+        func_params = list(func_sig.parameters.keys())
+        facade_param = self.__server_facade_extension_param_name
+
+        # Graph creation extensions that have the last arg named
+        # self.__server_facade_extension_param_name are passed a
+        # ExtensionServerFacade instance to allow them to query the "server" in
+        # a safe way, if needed.
+        if (facade_param in func_params):
+            if func_params[-1] == facade_param:
+                func_kwargs[facade_param] = ExtensionServerFacade(self)
+            else:
+                raise GaasError(f"{facade_param}, if specified, must be the "
+                                "last param.")
+
+        try:
+            graph_obj = func(*func_args, **func_kwargs)
+        except:
+            # FIXME: raise a more detailed error
+            raise GaasError(f"error running {func_name} : "
+                            f"{traceback.format_exc()}")
+        return self.__add_graph(graph_obj)
+
+    def initialize_dask_client(self, dask_scheduler_file=None,
+                               dask_comms="ucx"):
         """
         Initialize a dask client to be used for MG operations.
+
+        dask_comms is the dask comms backend to use, either "ucx" (the default)
+        or "mpi". "mpi" uses the GPU-aware MPI backend provided by mpi4dask,
+        which requires the dask scheduler and workers to also be using it. If
+        mpi4dask is not installed, "ucx" is used instead.
         """
+        if dask_comms not in ("ucx", "mpi"):
+            raise ValueError(f"dask_comms must be 'ucx' or 'mpi', got "
+                             f"{dask_comms!r}")
+
         if dask_scheduler_file is not None:
-            # Env var UCX_MAX_RNDV_RAILS=1 must be set too.
-            dask_initialize(enable_tcp_over_ucx=True,
-                            enable_nvlink=True,
-                            enable_infiniband=True,
-                            enable_rdmacm=True,
-                            # net_devices="mlx5_0:1",
-                            )
+            if dask_comms == "mpi":
+                try:
+                    # Importing mpi4dask registers its "mpi" comms backend with
+                    # dask, which is then used based on the scheduler address
+                    # in dask_scheduler_file. The module itself is not used.
+                    importlib.import_module("mpi4dask")
+                except ImportError:
+                    warnings.warn("mpi4dask is not installed, using UCX for "
+                                  "dask comms instead")
+                    dask_comms = "ucx"
+
+            if dask_comms == "ucx":
+                # Env var UCX_MAX_RNDV_RAILS=1 must be set too.
+                dask_initialize(enable_tcp_over_ucx=True,
+                                enable_nvlink=True,
+                                enable_infiniband=True,
+                                enable_rdmacm=True,
+                                # net_devices="mlx5_0:1",
+                                )
             self.__dask_client = Client(scheduler_file=dask_scheduler_file)
         else:
             # FIXME: LocalCUDACluster init. Implement when tests are in place.
@@ -259,6 +476,12 @@ class GaasHandler:
         if not Comms.is_initialized():
             Comms.initialize(p2p=True)
 
+        # scheduler_info() is an RPC to the scheduler, so only call it once here
+        # rather than each time the number of GPUs is needed. The cugraph comms
+        # initialized above only include the workers present now, so workers
+        # added later would not be used for MG operations anyway.
+        self.__num_gpus = len(self.__dask_client.scheduler_info()["workers"])
+
     def shutdown_dask_client(self):
         """
         Shutdown/cleanup the dask client for this handler instance.
@@ -272,6 +495,7 @@ class GaasHandler:
                 self.__dask_cluster = None
 
             self.__dask_client = None
+            self.__num_gpus = 1
 
     ############################################################################
     # Graph management
@@ -287,12 +511,16 @@ class GaasHandler:
         """
         Remove the graph identified by graph_id from the server.
         """
-        dG = self.__graph_objs.pop(graph_id, None)
-        if dG is None:
+        with self.__graph_objs_lock:
+            graph_entry = self.__graph_objs.pop(graph_id, None)
+            self.__remove_edge_ID_lookup(graph_id)
+            self.__edge_ID_query_counts.pop(graph_id, None)
+            self.__graph_locks.pop(graph_id, None)
+        if graph_entry is None:
             raise GaasError(f"invalid graph_id {graph_id}")
 
-        del dG
-        print(f'deleted graph with id {graph_id}')
+        del graph_entry
+        logger.debug("deleted graph with id %s", graph_id)
 
     def get_graph_ids(self):
         """
@@ -308,47 +536,23 @@ class GaasHandler:
         Dictionary items are string:union_objs, where union_objs are Value
         "unions" used for RPC serialization.
         """
-        valid_keys = set(["num_vertices",
-                          "num_vertices_from_vertex_data",
-                          "num_edges",
-                          "num_vertex_properties",
-                          "num_edge_properties",
-                          ])
         if len(keys) == 0:
-            keys = valid_keys
+            keys = self.__graph_info_keys
         else:
-            invalid_keys = set(keys) - valid_keys
+            invalid_keys = set(keys) - self.__graph_info_keys
             if len(invalid_keys) != 0:
                 raise GaasError(f"got invalid keys: {invalid_keys}")
 
-        G = self._get_graph(graph_id)
-        info = {}
-        if isinstance(G, (PropertyGraph, MGPropertyGraph)):
-            for k in keys:
-                if k == "num_vertices":
-                    info[k] = G.get_num_vertices()
-                elif k == "num_vertices_from_vertex_data":
-                    info[k] = G.get_num_vertices(include_edge_data=False)
-                elif k == "num_edges":
-                    info[k] = G.get_num_edges()
-                elif k == "num_vertex_properties":
-                    info[k] = len(G.vertex_property_names)
-                elif k == "num_edge_properties":
-                    info[k] = len(G.edge_property_names)
+        (G, is_pg) = self.__get_graph_entry(graph_id)
+        if is_pg:
+            info_funcs = self.__pg_info_funcs
         else:
-            for k in keys:
-                if k == "num_vertices":
-                    info[k] = G.number_of_vertices()
-                elif k == "num_vertices_from_vertex_data":
-                    info[k] = 0
-                elif k == "num_edges":
-                    info[k] = G.number_of_edges()
-                elif k == "num_vertex_properties":
-                    info[k] = 0
-                elif k == "num_edge_properties":
-                    info[k] = 0
-
-        return {key:ValueWrapper(value).union for (key, value) in info.items()}
+            info_funcs = self.__graph_info_funcs
+        with self.__get_graph_lock(graph_id):
+            info = {k: info_funcs[k](G) for k in keys}
+
+        # All graph info values are ints.
+        return {key:make_int_union(value) for (key, value) in info.items()}
 
     def get_graph_type(self, graph_id):
         """
@@ -373,14 +577,6 @@ class GaasHandler:
         default graph if not specified.
         """
         pG = self._get_graph(graph_id)
-        if header == -1:
-            header = "infer"
-        elif header == -2:
-            header = None
-
-        if len(names) == 0:
-            names = None
-
         # FIXME: error check that file exists
         # FIXME: error check that edgelist was read correctly
         try:
@@ -389,10 +585,13 @@ class GaasHandler:
                                                 dtypes=dtypes,
                                                 header=header,
                                                 names=names)
-            pG.add_vertex_data(gdf,
-                               type_name=type_name,
-                               vertex_col_name=vertex_col_name,
-                               property_columns=property_columns)
+            # Only the update to the graph is serialized, so CSVs for the same
+            # graph can still be read concurrently.
+            with self.__get_graph_lock(graph_id):
+                pG.add_vertex_data(gdf,
+                                   type_name=type_name,
+                                   vertex_col_name=vertex_col_name,
+                                   property_columns=property_columns)
         except:
             raise GaasError(f"{traceback.format_exc()}")
 
@@ -415,24 +614,17 @@ class GaasHandler:
         pG = self._get_graph(graph_id)
         # FIXME: error check that file exists
         # FIXME: error check that edgelist read correctly
-        if header == -1:
-            header = "infer"
-        elif header == -2:
-            header = None
-
-        if len(names) == 0:
-            names = None
-
         try:
             gdf = self.__get_dataframe_from_csv(csv_file_name,
                                                 delimiter=delimiter,
                                                 dtypes=dtypes,
                                                 header=header,
                                                 names=names)
-            pG.add_edge_data(gdf,
-                             type_name=type_name,
-                             vertex_col_names=vertex_col_names,
-                             property_columns=property_columns)
+            with self.__get_graph_lock(graph_id):
+                pG.add_edge_data(gdf,
+                                 type_name=type_name,
+                                 vertex_col_names=vertex_col_names,
+                                 property_columns=property_columns)
         except:
             raise GaasError(f"{traceback.format_exc()}")
 
@@ -450,15 +642,46 @@ class GaasHandler:
         graph_id must be associated with a Graph extracted from a PropertyGraph
         (MG or SG).
         """
-        G = self._get_graph(graph_id)
-        if isinstance(G, (PropertyGraph, MGPropertyGraph)):
+        (G, is_pg) = self.__get_graph_entry(graph_id)
+        if is_pg:
             raise GaasError("get_edge_IDs_for_vertices() only accepts an "
                             "extracted subgraph ID, got an ID for a "
                             f"{type(G)}.")
 
-        return self.__get_edge_IDs_from_graph_edge_data(G,
-                                                        src_vert_IDs,
-                                                        dst_vert_IDs)
+        # Extracted graphs are not modified after they are created, so the
+        # lookup dictionary for a graph remains valid until it is deleted.
+        with self.__graph_objs_lock:
+            edge_ID_lookup = self.__edge_ID_lookups.get(graph_id)
+            if edge_ID_lookup is not None:
+                self.__edge_ID_lookups.move_to_end(graph_id)
+            else:
+                num_queries = self.__edge_ID_query_counts.get(graph_id, 0)
+                if num_queries is not None:
+                    num_queries += 1
+                    self.__edge_ID_query_counts[graph_id] = num_queries
+
+        # Building a dictionary costs more than querying the edge data once, so
+        # only build one for a graph queried more than once.
+        if (edge_ID_lookup is None) and \
+           (num_queries is not None) and (num_queries > 1):
+            edge_ID_lookup = self.__create_edge_ID_lookup(G)
+            self.__add_edge_ID_lookup(graph_id, edge_ID_lookup)
+
+        if edge_ID_lookup is None:
+            return self.__get_edge_IDs_from_graph_edge_data(G,
+                                                            src_vert_IDs,
+                                                            dst_vert_IDs)
+
+        vert_ID_pairs = list(zip(src_vert_IDs, dst_vert_IDs))
+        try:
+            edge_IDs = [edge_ID_lookup[pair] for pair in vert_ID_pairs]
+        except KeyError:
+            missing = [pair for pair in vert_ID_pairs
+                       if pair not in edge_ID_lookup]
+            raise GaasError(f"no edges found for vertex ID pairs: {missing}")
+        if edge_IDs:
+            _check_int32_edge_IDs(min(edge_IDs), max(edge_IDs))
+        return edge_IDs
 
     def extract_subgraph(self,
                          create_using,
@@ -473,8 +696,8 @@ class GaasHandler:
         """
         Extract a subgraph, return a new graph ID
         """
-        pG = self._get_graph(graph_id)
-        if not(isinstance(pG, (PropertyGraph, MGPropertyGraph))):
+        (pG, is_pg) = self.__get_graph_entry(graph_id)
+        if not(is_pg):
             raise GaasError("extract_subgraph() can only be called on a graph "
                             "with properties.")
         # Convert defaults needed for the RPC API into defaults used by
@@ -486,13 +709,14 @@ class GaasHandler:
         # FIXME: create_using and selection should not be strings at this point
 
         try:
-            G = pG.extract_subgraph(create_using,
-                                    selection,
-                                    edge_weight_property,
-                                    default_edge_weight,
-                                    allow_multi_edges,
-                                    renumber_graph,
-                                    add_edge_data)
+            with self.__get_graph_lock(graph_id):
+                G = pG.extract_subgraph(create_using,
+                                        selection,
+                                        edge_weight_property,
+                                        default_edge_weight,
+                                        allow_multi_edges,
+                                        renumber_graph,
+                                        add_edge_data)
         except:
             raise GaasError(f"{traceback.format_exc()}")
 
@@ -518,8 +742,10 @@ class GaasHandler:
             columns = None
         else:
             columns = property_keys
-        df = pG.get_vertex_data(vertex_ids=ids, columns=columns)
-        return self.__get_graph_data_as_numpy_bytes(df, null_replacement_value)
+        with self.__get_graph_lock(graph_id):
+            df = pG.get_vertex_data(vertex_ids=ids, columns=columns)
+            return self.__get_graph_data_as_numpy_bytes(df,
+                                                        null_replacement_value)
 
     def get_graph_edge_data(self,
                             id_or_ids,
@@ -541,20 +767,24 @@ class GaasHandler:
             columns = None
         else:
             columns = property_keys
-        df = pG.get_edge_data(edge_ids=ids, columns=columns)
-        return self.__get_graph_data_as_numpy_bytes(df, null_replacement_value)
+        with self.__get_graph_lock(graph_id):
+            df = pG.get_edge_data(edge_ids=ids, columns=columns)
+            return self.__get_graph_data_as_numpy_bytes(df,
+                                                        null_replacement_value)
 
     def is_vertex_property(self, property_key, graph_id):
-        G = self._get_graph(graph_id)
-        if isinstance(G, (PropertyGraph, MGPropertyGraph)):
-            return property_key in G.vertex_property_names
+        (G, is_pg) = self.__get_graph_entry(graph_id)
+        if is_pg:
+            with self.__get_graph_lock(graph_id):
+                return property_key in G.vertex_property_names
 
         raise GaasError('Graph does not contain properties')
 
     def is_edge_property(self, property_key, graph_id):
-        G = self._get_graph(graph_id)
-        if isinstance(G, (PropertyGraph, MGPropertyGraph)):
-            return property_key in G.edge_property_names
+        (G, is_pg) = self.__get_graph_entry(graph_id)
+        if is_pg:
+            with self.__get_graph_lock(graph_id):
+                return property_key in G.edge_property_names
 
         raise GaasError('Graph does not contain properties')
 
@@ -563,8 +793,8 @@ class GaasHandler:
     def batched_ego_graphs(self, seeds, radius, graph_id):
         """
         """
-        st=time.time()
-        print("\n----- [GaaS] -----> starting egonet", flush=True)
+        st = time.time()
+        logger.debug("starting batched_ego_graphs")
         # FIXME: finish docstring above
         # FIXME: exception handling
         G = self._get_graph(graph_id)
@@ -578,34 +808,28 @@ class GaasHandler:
             # FIXME: update this to use call_algo()
             # FIXME: this should not be needed, need to update
             # cugraph.batched_ego_graphs to also accept a list
-            seeds = cudf.Series(seeds, dtype="int32")
-            st2=time.time()
-            print("  ----- [GaaS] -----> calling cuGraph", flush=True)
+            seeds = _as_int32_series(seeds)
+            st2 = time.time()
             (ego_edge_list, seeds_offsets) = \
                 cugraph.batched_ego_graphs(G, seeds, radius)
+            logger.debug("cugraph.batched_ego_graphs() returned %s edges, "
+                         "time was: %ss", len(ego_edge_list), time.time()-st2)
 
-            print(f"  ----- [GaaS] -----> FINISHED calling cuGraph, time was: {time.time()-st2}s", flush=True)
-            st2=time.time()
-            print("  ----- [GaaS] -----> copying to host", flush=True)
-            print(f"  ----- [GaaS] -----> {len(ego_edge_list['src'])} num edges", flush=True)
-            #batched_ego_graphs_result = BatchedEgoGraphsResult(
-            #    src_verts=ego_edge_list["src"].values_host.tobytes(),  #int32
-            #    dst_verts=ego_edge_list["dst"].values_host.tobytes(),  #int32
-            #    edge_weights=ego_edge_list["weight"].values_host.tobytes(),  #float64
-            #    seeds_offsets=seeds_offsets.values_host.tobytes()  #int64
-            #)
+            st2 = time.time()
             batched_ego_graphs_result = BatchedEgoGraphsResult(
-                src_verts=ego_edge_list["src"].values_host,
-                dst_verts=ego_edge_list["dst"].values_host,
-                edge_weights=ego_edge_list["weight"].values_host,
-                seeds_offsets=seeds_offsets.values_host
+                **_device_columns_to_host_buffers(
+                    {"src_verts": ego_edge_list["src"],
+                     "dst_verts": ego_edge_list["dst"],
+                     "edge_weights": ego_edge_list["weight"],
+                     "seeds_offsets": seeds_offsets})
             )
-            print(f"  ----- [GaaS] -----> FINISHED copying to host, time was: {time.time()-st2}s", flush=True)
-            return batched_ego_graphs_result
+            logger.debug("copied batched_ego_graphs result to host, time "
+                         "was: %ss", time.time()-st2)
         except:
             raise GaasError(f"{traceback.format_exc()}")
 
-        print(f"----- [GaaS] -----> FINISHED egonet, time was: {time.time()-st}s", flush=True)
+        logger.debug("finished batched_ego_graphs, time was: %ss",
+                     time.time()-st)
         return batched_ego_graphs_result
 
     def node2vec(self, start_vertices, max_depth, graph_id):
@@ -624,15 +848,16 @@ class GaasHandler:
             # FIXME: update this to use call_algo()
             # FIXME: this should not be needed, need to update cugraph.node2vec to
             # also accept a list
-            start_vertices = cudf.Series(start_vertices, dtype="int32")
+            start_vertices = _as_int32_series(start_vertices)
 
             (paths, weights, path_sizes) = \
                 cugraph.node2vec(G, start_vertices, max_depth)
 
             node2vec_result = Node2vecResult(
-                vertex_paths = paths.values_host,
-                edge_weights = weights.values_host,
-                path_sizes = path_sizes.values_host,
+                **_device_columns_to_host_buffers(
+                    {"vertex_paths": paths,
+                     "edge_weights": weights,
+                     "path_sizes": path_sizes})
             )
         except:
             raise GaasError(f"{traceback.format_exc()}")
@@ -645,8 +870,8 @@ class GaasHandler:
                                 with_replacement,
                                 graph_id,
                                 ):
-        G = self._get_graph(graph_id)
-        if isinstance(G, (MGPropertyGraph, PropertyGraph)):
+        (G, is_pg) = self.__get_graph_entry(graph_id)
+        if is_pg:
             raise GaasError("uniform_neighbor_sample() cannot operate directly "
                             "on a graph with properties, call "
                             "extract_subgraph() then call "
@@ -680,17 +905,7 @@ class GaasHandler:
         been created, then instantiate a new PropertyGraph as the default graph
         and return it.
         """
-        pG = self.__graph_objs.get(graph_id)
-
-        # Always create the default graph if it does not exist
-        if pG is None:
-            if graph_id == defaults.graph_id:
-                pG = self.__create_graph()
-                self.__graph_objs[graph_id] = pG
-            else:
-                raise GaasError(f"invalid graph_id {graph_id}")
-
-        return pG
+        return self.__get_graph_entry(graph_id)[0]
 
     ############################################################################
     # Private
@@ -704,28 +919,102 @@ class GaasHandler:
         Read a CSV into a DataFrame and return it. This will use either a cuDF
         DataFrame or a dask_cudf DataFrame based on if the handler is configured
         to use a dask cluster or not.
+
+        header and names are the values passed by the client, which represent
+        the header="infer" and header=None args as negative ints and no names
+        as an empty list.
         """
-        gdf = cudf.read_csv(csv_file_name,
-                            delimiter=delimiter,
-                            dtype=dtypes,
-                            header=header,
-                            names=names)
+        header = _csv_header_values.get(header, header)
+        names = names or None
+
         if self.is_mg:
-            num_gpus = len(self.__dask_client.scheduler_info()["workers"])
-            return dask_cudf.from_cudf(gdf, npartitions=num_gpus)
+            # Read directly into a dask_cudf DataFrame so each worker parses
+            # its own byte range of the file, rather than reading the entire
+            # file on one GPU and then partitioning it.
+            ddf = dask_cudf.read_csv(csv_file_name,
+                                     delimiter=delimiter,
+                                     dtype=dtypes,
+                                     header=header,
+                                     names=names)
+            # Small files may fit in fewer partitions than there are GPUs.
+            if ddf.npartitions < self.__num_gpus:
+                ddf = ddf.repartition(npartitions=self.__num_gpus)
+            return ddf
+
+        return cudf.read_csv(csv_file_name,
+                             delimiter=delimiter,
+                             dtype=dtypes,
+                             header=header,
+                             names=names)
+
+    def __update_graph_creation_extension_funcs(self):
+        """
+        Rebuild the function name:function mapping used to look up graph
+        creation extension functions. If more than one loaded module contains
+        the same name, the first module checked (in load order) is used.
 
-        return gdf
+        Must be called with self.__graph_creation_extensions_lock held.
+        """
+        funcs = {}
+        for module in self.__graph_creation_extensions.values():
+            for (name, obj) in vars(module).items():
+                if obj is not None:
+                    funcs.setdefault(name, obj)
+        # Replace the mapping rather than updating it in place, since it may be
+        # read from other threads.
+        self.__graph_creation_extension_funcs = funcs
+
+    def __get_graph_entry(self, graph_id):
+        """
+        Return a (graph, is_pg) tuple for graph_id, where is_pg is True if the
+        graph is a PropertyGraph or MGPropertyGraph. See _get_graph().
+        """
+        graph_entry = self.__graph_objs.get(graph_id)
+
+        # Always create the default graph if it does not exist
+        if graph_entry is None:
+            if graph_id == defaults.graph_id:
+                with self.__graph_objs_lock:
+                    # Check again in case another thread created it first
+                    graph_entry = self.__graph_objs.get(graph_id)
+                    if graph_entry is None:
+                        graph_entry = \
+                            self.__make_graph_entry(self.__create_graph())
+                        self.__graph_objs[graph_id] = graph_entry
+            else:
+                raise GaasError(f"invalid graph_id {graph_id}")
+
+        return graph_entry
+
+    def __get_graph_lock(self, graph_id):
+        """
+        Return the lock used to serialize access to the data of the graph
+        associated with graph_id, creating it if necessary.
+        """
+        with self.__graph_objs_lock:
+            return self.__graph_locks.setdefault(graph_id, threading.Lock())
 
     def __add_graph(self, G):
         """
         Create a new graph ID for G and add G to the internal mapping of
         graph ID:graph instance.
         """
-        gid = self.__next_graph_id
-        self.__graph_objs[gid] = G
-        self.__next_graph_id += 1
+        graph_entry = self.__make_graph_entry(G)
+        with self.__graph_objs_lock:
+            gid = self.__next_graph_id
+            self.__graph_objs[gid] = graph_entry
+            self.__next_graph_id += 1
         return gid
 
+    @staticmethod
+    def __make_graph_entry(G):
+        """
+        Return the (graph, is_pg) tuple stored for G in the internal mapping of
+        graph ID:graph instance. The graph type is checked once here rather
+        than on each call that needs to know if the graph has properties.
+        """
+        return (G, isinstance(G, (PropertyGraph, MGPropertyGraph)))
+
     def __create_graph(self):
         """
         Instantiate a graph object using a type appropriate for the handler (
@@ -739,22 +1028,73 @@ class GaasHandler:
         Removes all column names from pg_column_names that are "internal" (ie.
         used for PropertyGraph bookkeeping purposes only)
         """
-        internal_column_names=[PropertyGraph.vertex_col_name,
-                               PropertyGraph.src_col_name,
-                               PropertyGraph.dst_col_name,
-                               PropertyGraph.type_col_name,
-                               PropertyGraph.edge_id_col_name,
-                               PropertyGraph.vertex_id_col_name,
-                               PropertyGraph.weight_col_name]
-
         # Create a list of user-visible columns by removing the internals while
         # preserving order
-        user_visible_column_names = list(pg_column_names)
-        for internal_column_name in internal_column_names:
-            if internal_column_name in user_visible_column_names:
-                user_visible_column_names.remove(internal_column_name)
+        return [name for name in pg_column_names
+                if name not in self.__internal_column_names]
+
+    def __create_edge_ID_lookup(self, G):
+        """
+        Return a (src, dst):edge ID dictionary for all edges in G, or None if G
+        has more than __edge_ID_lookup_max_edges edges.
 
-        return user_visible_column_names
+        If a pair of vertex IDs matches more than one edge (ie. multi-edges),
+        the lowest matching edge ID is used, as in
+        __get_edge_IDs_from_graph_edge_data().
+
+        G must have an "edge_data" attribute.
+        """
+        src_col_name = PropertyGraph.src_col_name
+        dst_col_name = PropertyGraph.dst_col_name
+        edge_id_col_name = PropertyGraph.edge_id_col_name
+
+        edge_data = G.edge_data[[src_col_name, dst_col_name, edge_id_col_name]]
+        if len(edge_data) > self.__edge_ID_lookup_max_edges:
+            return None
+        if self.is_mg:
+            edge_data = edge_data.compute()
+
+        # Sort by descending edge ID so the lowest edge ID for a pair is the
+        # last one inserted and therefore the one kept.
+        edge_data = edge_data.sort_values(by=edge_id_col_name, ascending=False)
+        srcs = edge_data[src_col_name].values_host.tolist()
+        dsts = edge_data[dst_col_name].values_host.tolist()
+        edge_IDs = edge_data[edge_id_col_name].values_host.tolist()
+
+        return dict(zip(zip(srcs, dsts), edge_IDs))
+
+    def __add_edge_ID_lookup(self, graph_id, edge_ID_lookup):
+        """
+        Add the edge ID lookup dictionary for the graph associated with
+        graph_id, discarding the least recently used dictionaries if needed to
+        stay within __edge_ID_lookups_max_total_edges. edge_ID_lookup is None
+        if the graph is too large to have one.
+        """
+        with self.__graph_objs_lock:
+            # Do not add a lookup for a graph deleted in the meantime, or one
+            # already added by a concurrent call.
+            if (graph_id not in self.__graph_objs) or \
+               (graph_id in self.__edge_ID_lookups):
+                return
+            if edge_ID_lookup is None:
+                self.__edge_ID_query_counts[graph_id] = None
+                return
+
+            self.__edge_ID_lookups[graph_id] = edge_ID_lookup
+            self.__edge_ID_lookups_num_edges += len(edge_ID_lookup)
+            while self.__edge_ID_lookups_num_edges > \
+                  self.__edge_ID_lookups_max_total_edges:
+                lru_graph_id = next(iter(self.__edge_ID_lookups))
+                self.__remove_edge_ID_lookup(lru_graph_id)
+
+    def __remove_edge_ID_lookup(self, graph_id):
+        """
+        Remove the edge ID lookup dictionary for the graph associated with
+        graph_id, if any. Must be called with __graph_objs_lock held.
+        """
+        edge_ID_lookup = self.__edge_ID_lookups.pop(graph_id, None)
+        if edge_ID_lookup is not None:
+            self.__edge_ID_lookups_num_edges -= len(edge_ID_lookup)
 
     # FIXME: consider adding this to PropertyGraph
     def __get_edge_IDs_from_graph_edge_data(self,
@@ -769,25 +1109,60 @@ class GaasHandler:
         return the edge IDs for edges (0, 7), (1, 8), and (2, 9).
 
         G must have an "edge_data" attribute.
+
+        If a pair of vertex IDs matches more than one edge (ie. multi-edges),
+        the lowest matching edge ID is returned for it. A GaasError is raised if
+        any pair does not define an edge in G.
         """
-        edge_IDs = []
+        src_col_name = PropertyGraph.src_col_name
+        dst_col_name = PropertyGraph.dst_col_name
+        edge_id_col_name = PropertyGraph.edge_id_col_name
+        # Position of each vertex ID pair in the args, used to return the edge
+        # IDs in the same order.
+        pair_index_col_name = "_pair_index"
+
+        edge_data = G.edge_data[[src_col_name, dst_col_name, edge_id_col_name]]
+        # Get the vertex ID dtypes from the frame's dtypes once, rather than
+        # creating a (dask) Series for each column just to read its dtype.
+        edge_data_dtypes = edge_data.dtypes
         num_edges = len(src_vert_IDs)
-
-        for i in range(num_edges):
-            src_mask = G.edge_data[PropertyGraph.src_col_name] == \
-                src_vert_IDs[i]
-            dst_mask = G.edge_data[PropertyGraph.dst_col_name] == \
-                dst_vert_IDs[i]
-            value = G.edge_data[src_mask & dst_mask]\
-                [PropertyGraph.edge_id_col_name]
-
-            # FIXME: This will compute the result (if using dask) then transfer
-            # to host memory for each iteration - is there a more efficient way?
-            if self.is_mg:
-                value = value.compute()
-            edge_IDs.append(value.values_host[0])
-
-        return edge_IDs
+        pairs = cudf.DataFrame({
+            src_col_name: cudf.Series(src_vert_IDs,
+                                      dtype=edge_data_dtypes[src_col_name]),
+            dst_col_name: cudf.Series(dst_vert_IDs,
+                                      dtype=edge_data_dtypes[dst_col_name]),
+            pair_index_col_name: cupy.arange(num_edges),
+        })
+
+        # Find the edges for all pairs with a single merge, rather than
+        # filtering the edge data (and computing the result if using dask)
+        # once per pair.
+        if self.is_mg:
+            pairs = dask_cudf.from_cudf(pairs, npartitions=1)
+        matched = edge_data.merge(pairs,
+                                  on=[src_col_name, dst_col_name],
+                                  how="inner")
+        edge_IDs = matched[[pair_index_col_name, edge_id_col_name]]\
+            .groupby(pair_index_col_name)[edge_id_col_name]\
+            .min()
+        if self.is_mg:
+            edge_IDs = edge_IDs.compute()
+        edge_IDs = edge_IDs.sort_index()
+
+        if len(edge_IDs) != num_edges:
+            found = set(edge_IDs.index.values_host.tolist())
+            missing = [(src_vert_IDs[i], dst_vert_IDs[i])
+                       for i in range(num_edges) if i not in found]
+            raise GaasError(f"no edges found for vertex ID pairs: {missing}")
+
+        # Copy the edge IDs to host using pinned memory, as the algo results
+        # are. Edge IDs are returned to clients as a list<i32>.
+        edge_IDs_buffer = _device_columns_to_host_buffers(
+            {"edge_IDs": edge_IDs})["edge_IDs"]
+        edge_IDs = ndarray_from_bytes(edge_IDs_buffer)
+        if len(edge_IDs) > 0:
+            _check_int32_edge_IDs(edge_IDs.min(), edge_IDs.max())
+        return edge_IDs.tolist()
 
     def __get_graph_data_as_numpy_bytes(self,
                                         dataframe,
@@ -799,21 +1174,27 @@ class GaasHandler:
         """
         try:
             if dataframe is None:
-                return np.ndarray(shape=(0, 0)).dumps()
+                return ndarray_to_bytes(np.ndarray(shape=(0, 0)))
             elif isinstance(dataframe, dask_cudf.DataFrame):
                 df = dataframe.compute()
             else:
                 df = dataframe
 
-            # null_replacement_value is a Value "union"
-            n = ValueWrapper(null_replacement_value).get_py_obj()
-
-            # This needs to be a copy of the df data to replace NA values
             # FIXME: should something other than a numpy type be serialized to
             # prevent a copy? (note: any other type required to be de-serialzed
             # on the client end could add dependencies on the client)
-            df_numpy = df.to_numpy(na_value=n)
-            return df_numpy.dumps()
+            #
+            # Replacing NA values requires an additional copy of the df data,
+            # so only do it if a column actually contains NA values. The null
+            # count of each column is cached by cudf, so this check does not
+            # scan the data.
+            if any(df[col_name].has_nulls for col_name in df.columns):
+                # null_replacement_value is a Value "union"
+                n = ValueWrapper(null_replacement_value).get_py_obj()
+                df_numpy = df.to_numpy(na_value=n)
+            else:
+                df_numpy = df.to_numpy()
+            return ndarray_to_bytes(df_numpy)
 
         except:
             raise GaasError(f"{traceback.format_exc()}")
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import argparse
+import logging
 from pathlib import Path
 
 from gaas_client import defaults
@@ -21,11 +22,14 @@ from gaas_server.gaas_handler import GaasHandler
 
 
 def create_handler(graph_creation_extension_dir=None,
-                   dask_scheduler_file=None):
+                   dask_scheduler_file=None,
+                   dask_comms="ucx"):
     """
     Create and return a GaasHandler instance initialized with options. Setting
     graph_creation_extension_dir to a valid dir results in the handler loading
-    graph creation extensions from that dir.
+    graph creation extensions from that dir. dask_comms is the comms backend
+    used with the dask cluster specified by dask_scheduler_file (see
+    GaasHandler.initialize_dask_client()).
     """
     handler = GaasHandler()
     if graph_creation_extension_dir is not None:
@@ -33,16 +37,20 @@ def create_handler(graph_creation_extension_dir=None,
     if dask_scheduler_file is not None:
         # FIXME: if initialize_dask_client(None) is called, it creates a
         # LocalCUDACluster. Add support for this via a different CLI option?
-        handler.initialize_dask_client(dask_scheduler_file)
+        handler.initialize_dask_client(dask_scheduler_file, dask_comms)
     return handler
 
 
-def start_server_blocking(handler, host, port):
+def start_server_blocking(handler, host, port, protocol=defaults.protocol,
+                          client_timeout=defaults.client_timeout):
     """
     Start the GaaS server on host/port, using handler as the request handler
-    instance. This call blocks indefinitely until Ctrl-C.
+    instance and protocol as the Thrift protocol. Client connections idle for
+    longer than client_timeout milliseconds are closed. This call blocks
+    indefinitely until Ctrl-C.
     """
-    server = create_server(handler, host=host, port=port)
+    server = create_server(handler, host=host, port=port,
+                           client_timeout=client_timeout, protocol=protocol)
     server.serve()  # blocks until Ctrl-C (kill -2)
 
 
@@ -59,6 +67,18 @@ if __name__ == "__main__":
                             default=defaults.port,
                             help="port the server should listen on, default " \
                             f"is {defaults.port}")
+    arg_parser.add_argument("--protocol",
+                            type=str,
+                            choices=["binary", "compact"],
+                            default=defaults.protocol,
+                            help="Thrift protocol to use, clients must use " \
+                            f"the same protocol, default is {defaults.protocol}")
+    arg_parser.add_argument("--client-timeout",
+                            type=int,
+                            default=defaults.client_timeout,
+                            help="milliseconds an open client connection may " \
+                            "be idle before the server closes it, default " \
+                            f"is {defaults.client_timeout}")
     arg_parser.add_argument("--graph-creation-extension-dir",
                             type=Path,
                             help="dir to load graph creation extension " \
@@ -67,9 +87,25 @@ if __name__ == "__main__":
                             type=Path,
                             help="file generated by a dask scheduler, used " \
                             "for connecting to a dask cluster for MG support")
+    arg_parser.add_argument("--dask-comms",
+                            type=str,
+                            choices=["ucx", "mpi"],
+                            default="ucx",
+                            help="comms backend to use with the dask cluster, " \
+                            "\"mpi\" requires mpi4dask, default is ucx")
+    arg_parser.add_argument("--log-level",
+                            type=str,
+                            choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                            default="WARNING",
+                            help="level of the messages logged by the " \
+                            "server (eg. DEBUG includes the timing of some " \
+                            "calls), default is WARNING")
     args = arg_parser.parse_args()
+    logging.basicConfig(level=args.log_level)
     handler = create_handler(args.graph_creation_extension_dir,
-                             args.dask_scheduler_file)
+                             args.dask_scheduler_file,
+                             args.dask_comms)
     print("Starting GaaS...", flush=True)
-    start_server_blocking(handler, args.host, args.port)
+    start_server_blocking(handler, args.host, args.port, args.protocol,
+                          args.client_timeout)
     print("done.")
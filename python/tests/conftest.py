@@ -126,9 +126,11 @@ def graph_creation_function_vert_and_edge_data_big_vertex_ids(gaas_server):
 """
 
 ################################################################################
-## module scope fixtures
+## session scope fixtures
 
-@pytest.fixture(scope="module")
+# Session scoped since the e2e server fixture, which is started once per test
+# session, preloads this extension dir.
+@pytest.fixture(scope="session")
 def graph_creation_extension1():
     with TemporaryDirectory() as tmp_extension_dir:
         # write graph creation extension .py file
@@ -141,6 +143,9 @@ def graph_creation_extension1():
 
         yield tmp_extension_dir
 
+################################################################################
+## module scope fixtures
+
 @pytest.fixture(scope="module")
 def graph_creation_extension2():
     with TemporaryDirectory() as tmp_extension_dir:
@@ -16,8 +16,9 @@ import os
 import sys
 import subprocess
 import time
-from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pytest
 
 from . import data
@@ -26,7 +27,11 @@ from . import data
 ###############################################################################
 ## fixtures
 
-@pytest.fixture(scope="module")
+# IDs of graphs loaded once and shared by all tests in the session, which the
+# client fixture does not delete.
+_session_graph_ids = set()
+
+@pytest.fixture(scope="session")
 def server(graph_creation_extension1):
     """
     Start a GaaS server, stop it when done with the fixture.  This also uses
@@ -74,7 +79,9 @@ def server(graph_creation_extension1):
             try:
                 print("\nLaunched GaaS server, waiting for it to start...",
                       end="", flush=True)
-                max_retries = 10
+                # Poll with an exponential backoff (starting at 10ms, capped at
+                # 0.5s) so a server that starts quickly is used right away.
+                max_retries = 25
                 retries = 0
                 while retries < max_retries:
                     try:
@@ -82,7 +89,7 @@ def server(graph_creation_extension1):
                         print("started.")
                         break
                     except GaasError:
-                        time.sleep(1)
+                        time.sleep(min(0.01 * 2**retries, 0.5))
                         retries += 1
                 if retries >= max_retries:
                     raise RuntimeError("error starting server")
@@ -110,8 +117,10 @@ def client(server):
 
     client = GaasClient(defaults.host, defaults.port)
 
+    # Graphs shared by all tests in the session are not deleted
     for gid in client.get_graph_ids():
-        client.delete_graph(gid)
+        if gid not in _session_graph_ids:
+            client.delete_graph(gid)
 
     #client.unload_graph_creation_extensions()
 
@@ -132,53 +141,107 @@ def client_with_edgelist_csv_loaded(client):
                                  dtypes=test_data["dtypes"],
                                  vertex_col_names=["0", "1"],
                                  type_name="")
-    assert client.get_graph_ids() == [0]
+    # Graphs shared by the session, which the client fixture does not delete,
+    # may also exist.
+    graph_ids = [gid for gid in client.get_graph_ids()
+                 if gid not in _session_graph_ids]
+    assert graph_ids == [0]
     return (client, test_data)
 
 
-@pytest.fixture(scope="function")
-def client_with_property_csvs_loaded(client):
+@pytest.fixture(scope="session")
+def property_csvs_loaded_session(server):
     """
-    Loads each of the vertex and edge property CSVs into the default graph on
-    the server.
+    Loads each of the vertex and edge property CSVs into a new graph on the
+    server once per test session, and returns its graph ID. Tests must not
+    modify this graph; tests that need to should load their own.
+
+    The CSVs are loaded concurrently, so the edge IDs assigned to each edge
+    type and the order of the property columns depend on the order the loads
+    complete in and can differ between runs. Tests must not depend on either.
     """
+    from gaas_client import GaasClient, defaults
+
+    client = GaasClient(defaults.host, defaults.port)
+    graph_id = client.create_graph()
+    _session_graph_ids.add(graph_id)
+
     merchants = data.property_csv_data["merchants"]
     users = data.property_csv_data["users"]
     transactions = data.property_csv_data["transactions"]
     relationships = data.property_csv_data["relationships"]
     referrals = data.property_csv_data["referrals"]
 
-    client.load_csv_as_vertex_data(merchants["csv_file_name"],
-                                   dtypes=merchants["dtypes"],
-                                   vertex_col_name=merchants["vert_col_name"],
-                                   header=0,
-                                   type_name="merchants")
-    client.load_csv_as_vertex_data(users["csv_file_name"],
-                                   dtypes=users["dtypes"],
-                                   vertex_col_name=users["vert_col_name"],
-                                   header=0,
-                                   type_name="users")
-
-    client.load_csv_as_edge_data(transactions["csv_file_name"],
-                                 dtypes=transactions["dtypes"],
-                                 vertex_col_names=\
-                                 transactions["vert_col_names"],
-                                 header=0,
-                                 type_name="transactions")
-    client.load_csv_as_edge_data(relationships["csv_file_name"],
-                                 dtypes=relationships["dtypes"],
-                                 vertex_col_names=\
-                                 relationships["vert_col_names"],
-                                 header=0,
-                                 type_name="relationships")
-    client.load_csv_as_edge_data(referrals["csv_file_name"],
-                                 dtypes=referrals["dtypes"],
-                                 vertex_col_names=referrals["vert_col_names"],
-                                 header=0,
-                                 type_name="referrals")
-
-    assert client.get_graph_ids() == [0]
-    return (client, data.property_csv_data)
+    def load_csv(load_method_name, *args, **kwargs):
+        # A GaasClient is not safe to share between threads, so use a separate
+        # client for each load. The clients share pooled server connections.
+        thread_client = GaasClient(defaults.host, defaults.port)
+        try:
+            getattr(thread_client, load_method_name)(*args, **kwargs)
+        finally:
+            thread_client.close()
+
+    # The CSVs are independent of each other, so load them concurrently. The
+    # server reads each CSV in parallel and serializes the graph updates.
+    with ThreadPoolExecutor() as executor:
+        futures = [
+            executor.submit(load_csv, "load_csv_as_vertex_data",
+                            merchants["csv_file_name"],
+                            dtypes=merchants["dtypes"],
+                            vertex_col_name=merchants["vert_col_name"],
+                            header=0,
+                            graph_id=graph_id,
+                            type_name="merchants"),
+            executor.submit(load_csv, "load_csv_as_vertex_data",
+                            users["csv_file_name"],
+                            dtypes=users["dtypes"],
+                            vertex_col_name=users["vert_col_name"],
+                            header=0,
+                            graph_id=graph_id,
+                            type_name="users"),
+            executor.submit(load_csv, "load_csv_as_edge_data",
+                            transactions["csv_file_name"],
+                            dtypes=transactions["dtypes"],
+                            vertex_col_names=transactions["vert_col_names"],
+                            header=0,
+                            graph_id=graph_id,
+                            type_name="transactions"),
+            executor.submit(load_csv, "load_csv_as_edge_data",
+                            relationships["csv_file_name"],
+                            dtypes=relationships["dtypes"],
+                            vertex_col_names=relationships["vert_col_names"],
+                            header=0,
+                            graph_id=graph_id,
+                            type_name="relationships"),
+            executor.submit(load_csv, "load_csv_as_edge_data",
+                            referrals["csv_file_name"],
+                            dtypes=referrals["dtypes"],
+                            vertex_col_names=referrals["vert_col_names"],
+                            header=0,
+                            graph_id=graph_id,
+                            type_name="referrals"),
+        ]
+        # Re-raise any exception from a load
+        for future in futures:
+            future.result()
+
+    # yield control to the tests
+    yield graph_id
+
+    _session_graph_ids.discard(graph_id)
+    client.delete_graph(graph_id)
+    client.close()
+
+
+@pytest.fixture(scope="function")
+def client_with_property_csvs_loaded(client, property_csvs_loaded_session):
+    """
+    Returns a client and the ID of the graph with the property CSVs loaded,
+    which is shared with other tests and must not be modified.
+    """
+    graph_id = property_csvs_loaded_session
+    assert graph_id in client.get_graph_ids()
+    return (client, graph_id, data.property_csv_data)
 
 
 ###############################################################################
@@ -189,20 +252,22 @@ def test_get_graph_info_key_types(client_with_property_csvs_loaded):
     """
     from gaas_client.exceptions import GaasError
 
-    (client, test_data) = client_with_property_csvs_loaded
+    (client, graph_id, test_data) = client_with_property_csvs_loaded
 
     with pytest.raises(TypeError):
-        client.get_graph_info(21)  # bad key type
+        client.get_graph_info(21, graph_id=graph_id)  # bad key type
     with pytest.raises(TypeError):
-        client.get_graph_info([21, "num_edges"])  # bad key type
+        client.get_graph_info([21, "num_edges"],
+                              graph_id=graph_id)  # bad key type
     with pytest.raises(GaasError):
-        client.get_graph_info("21")  # bad key value
+        client.get_graph_info("21", graph_id=graph_id)  # bad key value
     with pytest.raises(GaasError):
-        client.get_graph_info(["21"])  # bad key value
+        client.get_graph_info(["21"], graph_id=graph_id)  # bad key value
     with pytest.raises(GaasError):
-        client.get_graph_info(["num_edges", "21"])  # bad key value
+        client.get_graph_info(["num_edges", "21"],
+                              graph_id=graph_id)  # bad key value
 
-    client.get_graph_info()  # valid
+    client.get_graph_info(graph_id=graph_id)  # valid
 
 def test_get_num_edges_default_graph(client_with_edgelist_csv_loaded):
     (client, test_data) = client_with_edgelist_csv_loaded
@@ -248,9 +313,14 @@ def test_node2vec(client_with_edgelist_csv_loaded):
     (vertex_paths, edge_weights, path_sizes) = \
         client.node2vec(start_vertices, max_depth, extracted_gid)
     # FIXME: consider a more thorough test
-    assert isinstance(vertex_paths, list) and len(vertex_paths)
-    assert isinstance(edge_weights, list) and len(edge_weights)
-    assert isinstance(path_sizes, list) and len(path_sizes)
+    assert isinstance(vertex_paths, np.ndarray) and len(vertex_paths)
+    assert isinstance(edge_weights, np.ndarray) and len(edge_weights)
+    assert isinstance(path_sizes, np.ndarray) and len(path_sizes)
+    # The arrays have the dtypes used on the server, so the vertex IDs have
+    # the dtype of the vertex columns in the CSV (see data.py).
+    assert vertex_paths.dtype == np.int32
+    assert edge_weights.dtype.kind == "f"
+    assert path_sizes.dtype.kind == "i"
 
 
 def test_extract_subgraph(client_with_edgelist_csv_loaded):
@@ -328,66 +398,68 @@ def test_call_graph_creation_extension(client):
 
 
 def test_get_graph_vertex_data(client_with_property_csvs_loaded):
-    (client, test_data) = client_with_property_csvs_loaded
+    (client, graph_id, test_data) = client_with_property_csvs_loaded
 
     # FIXME: do not hardcode the shape values, get them from the input data.
-    np_array_all_vertex_data = client.get_graph_vertex_data()
+    np_array_all_vertex_data = client.get_graph_vertex_data(graph_id=graph_id)
     assert np_array_all_vertex_data.shape == (9, 9)
 
     # The remaining tests get individual vertex data - compare those to the
     # all_vertex_data retrieved earlier.
     vert_ids = [11, 86, 89021]
-    np_array = client.get_graph_vertex_data(vert_ids)
+    np_array = client.get_graph_vertex_data(vert_ids, graph_id=graph_id)
     assert np_array.shape == (3, 9)
     # The 1st element is the vert ID
     for (i, vid) in enumerate(vert_ids):
         assert np_array[i][0] == vid
 
-    np_array = client.get_graph_vertex_data(11)
+    np_array = client.get_graph_vertex_data(11, graph_id=graph_id)
     assert np_array.shape == (1, 9)
     assert np_array[0][0] == 11
 
-    np_array = client.get_graph_vertex_data(86)
+    np_array = client.get_graph_vertex_data(86, graph_id=graph_id)
     assert np_array.shape == (1, 9)
     assert np_array[0][0] == 86
 
 
 def test_get_graph_edge_data(client_with_property_csvs_loaded):
-    (client, test_data) = client_with_property_csvs_loaded
+    (client, graph_id, test_data) = client_with_property_csvs_loaded
 
     # FIXME: do not hardcode the shape values, get them from the input data.
-    np_array_all_rows = client.get_graph_edge_data()
+    np_array_all_rows = client.get_graph_edge_data(graph_id=graph_id)
     assert np_array_all_rows.shape == (17, 11)
 
     # The remaining tests get individual edge data - compare those to the
     # all_edge_data retrieved earlier.
     edge_ids = [0, 1, 2]
-    np_array = client.get_graph_edge_data(edge_ids)
+    np_array = client.get_graph_edge_data(edge_ids, graph_id=graph_id)
     assert np_array.shape == (3, 11)
     # The 3rd element is the edge ID
     for (i, eid) in enumerate(edge_ids):
         assert np_array[i][2] == eid
 
-    np_array = client.get_graph_edge_data(0)
+    np_array = client.get_graph_edge_data(0, graph_id=graph_id)
     assert np_array.shape == (1, 11)
     assert np_array[0][2] == 0
 
-    np_array = client.get_graph_edge_data(1)
+    np_array = client.get_graph_edge_data(1, graph_id=graph_id)
     assert np_array.shape == (1, 11)
     assert np_array[0][2] == 1
 
 
 def test_get_graph_info(client_with_property_csvs_loaded):
-    (client, test_data) = client_with_property_csvs_loaded
+    (client, graph_id, test_data) = client_with_property_csvs_loaded
 
     info = client.get_graph_info(["num_vertices",
-                                  "num_vertex_properties"])
+                                  "num_vertex_properties"],
+                                 graph_id=graph_id)
     data = (info["num_vertices"],
             info["num_vertex_properties"])
     # FIXME: do not hardcode values, get them from the input data.
     assert data == (9, 7)
 
-    info = client.get_graph_info(["num_edges", "num_edge_properties"])
+    info = client.get_graph_info(["num_edges", "num_edge_properties"],
+                                 graph_id=graph_id)
     data = (info["num_edges"], info["num_edge_properties"])
     # FIXME: do not hardcode values, get them from the input data.
     assert data == (17, 7)
@@ -405,12 +477,12 @@ def test_batched_ego_graphs(client_with_edgelist_csv_loaded):
 
     (srcs, dsts, weights, seeds_offsets) = results_lists
 
-    assert isinstance(srcs, Sequence)
-    assert isinstance(dsts, Sequence)
-    assert isinstance(weights, Sequence)
+    assert isinstance(srcs, np.ndarray)
+    assert isinstance(dsts, np.ndarray)
+    assert isinstance(weights, np.ndarray)
     assert len(srcs) == len(dsts) == len(weights)
 
-    assert isinstance(seeds_offsets, Sequence)
+    assert isinstance(seeds_offsets, np.ndarray)
     assert len(srcs) == seeds_offsets[-1]
 
 
@@ -446,7 +518,13 @@ def test_uniform_neighbor_sampling(client_with_edgelist_csv_loaded):
                                        graph_id=defaults.graph_id)
 
     extracted_gid = client.extract_subgraph(renumber_graph=True)
-    result = client.uniform_neighbor_sample(start_list=start_list,
-                                            fanout_vals=fanout_vals,
-                                            with_replacement=with_replacement,
-                                            graph_id=extracted_gid)
+    (sources, destinations, indices) = \
+        client.uniform_neighbor_sample(start_list=start_list,
+                                       fanout_vals=fanout_vals,
+                                       with_replacement=with_replacement,
+                                       graph_id=extracted_gid)
+
+    assert isinstance(sources, np.ndarray) and len(sources)
+    assert isinstance(destinations, np.ndarray) and len(destinations)
+    assert isinstance(indices, np.ndarray) and len(indices)
+    assert len(sources) == len(destinations) == len(indices)
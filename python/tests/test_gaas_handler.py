@@ -12,8 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import pickle
-
 import pytest
 
 
@@ -64,6 +62,12 @@ def test_load_and_call_graph_creation_extension(graph_creation_extension2):
         handler.call_graph_creation_extension("my_graph_creation_function",
                                               "('a',)", "{}")
 
+    # Args that are not literals
+    with pytest.raises(GaasError):
+        handler.call_graph_creation_extension("my_graph_creation_function",
+                                              "(__import__('os'), 'b', 'c')",
+                                              "{}")
+
     # This call should succeed and should result in a new PropertyGraph present
     # in the handler instance.
     new_graph_ID = handler.call_graph_creation_extension(
@@ -161,6 +165,7 @@ def test_get_graph_data_large_vertex_ids(
     Test that graphs with large vertex ID values (>int32) are handled.
     """
     from gaas_server.gaas_handler import GaasHandler
+    from gaas_client.types import ndarray_from_bytes
 
     handler = GaasHandler()
 
@@ -178,7 +183,7 @@ def test_get_graph_data_large_vertex_ids(
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(vert_data)) == 0
+    assert len(ndarray_from_bytes(vert_data)) == 0
 
     large_vert_id = (2**32)+1
     vert_data = handler.get_graph_vertex_data(
@@ -187,7 +192,7 @@ def test_get_graph_data_large_vertex_ids(
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(vert_data)) == 1
+    assert len(ndarray_from_bytes(vert_data)) == 1
 
     invalid_edge_id = (2**32)+1
     edge_data = handler.get_graph_edge_data(
@@ -196,7 +201,7 @@ def test_get_graph_data_large_vertex_ids(
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(edge_data)) == 0
+    assert len(ndarray_from_bytes(edge_data)) == 0
 
     small_edge_id = 2
     edge_data = handler.get_graph_edge_data(
@@ -205,13 +210,14 @@ def test_get_graph_data_large_vertex_ids(
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(edge_data)) == 1
+    assert len(ndarray_from_bytes(edge_data)) == 1
 
 def test_get_graph_data_empty_graph(graph_creation_extension_empty_graph):
     """
     Tests that get_graph_*_data() handles empty graphs correctly.
     """
     from gaas_server.gaas_handler import GaasHandler
+    from gaas_client.types import ndarray_from_bytes
 
     handler = GaasHandler()
 
@@ -229,7 +235,7 @@ def test_get_graph_data_empty_graph(graph_creation_extension_empty_graph):
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(vert_data)) == 0
+    assert len(ndarray_from_bytes(vert_data)) == 0
 
     invalid_edge_id = 2
     edge_data = handler.get_graph_edge_data(
@@ -238,4 +244,4 @@ def test_get_graph_data_empty_graph(graph_creation_extension_empty_graph):
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(edge_data)) == 0
+    assert len(ndarray_from_bytes(edge_data)) == 0
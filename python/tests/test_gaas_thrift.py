@@ -0,0 +1,221 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from gaas_client.gaas_thrift import protocol_factories
+
+
+###############################################################################
+## fixtures
+
+# Arrays returned by SimpleHandler
+vertex_data = np.arange(12, dtype="int64").reshape(4, 3)
+edge_data = np.array([[0, "a"], [1, None]], dtype=object)
+vertex_paths = np.array([0, 1, 2**40], dtype="int64")
+edge_weights = np.array([0.5, 1.5], dtype="float32")
+path_sizes = np.array([3], dtype="int32")
+
+
+class SimpleHandler:
+    """
+    Handler implementing only the GaasService calls used by these tests, so a
+    server can be run without a GPU.
+    """
+    def uptime(self):
+        return 42
+
+    def delete_graph(self, graph_id):
+        from gaas_client.exceptions import GaasError
+        raise GaasError(f"invalid graph_id {graph_id}")
+
+    def get_graph_vertex_data(self, vertex_id, null_replacement_value,
+                              graph_id, property_keys):
+        # A raw payload, returned as a bytearray
+        from gaas_client.types import ndarray_to_bytes
+        return ndarray_to_bytes(vertex_data)
+
+    def get_graph_edge_data(self, edge_id, null_replacement_value, graph_id,
+                            property_keys):
+        # A pickled payload, returned as bytes
+        from gaas_client.types import ndarray_to_bytes
+        return ndarray_to_bytes(edge_data)
+
+    def node2vec(self, start_vertices, max_depth, graph_id):
+        # memoryviews, as returned by the server for device arrays
+        from gaas_client.types import Node2vecResult, ndarray_to_bytes
+        return Node2vecResult(
+            vertex_paths=memoryview(ndarray_to_bytes(vertex_paths)),
+            edge_weights=memoryview(ndarray_to_bytes(edge_weights)),
+            path_sizes=memoryview(ndarray_to_bytes(path_sizes)))
+
+
+def start_simple_server(client_timeout, protocol):
+    """
+    Start a server for a SimpleHandler in a daemon thread, return the server
+    and the port it is listening on.
+    """
+    from gaas_client.gaas_thrift import create_server
+
+    # Get an unused port from the OS
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        port = sock.getsockname()[1]
+
+    server = create_server(SimpleHandler(), "localhost", port,
+                           client_timeout=client_timeout, protocol=protocol)
+    threading.Thread(target=server.serve, daemon=True).start()
+
+    # Wait for the server to start listening
+    for _ in range(100):
+        try:
+            socket.create_connection(("localhost", port)).close()
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.01)
+    else:
+        raise RuntimeError("error starting server")
+
+    return (server, port)
+
+
+@pytest.fixture(scope="function", params=list(protocol_factories))
+def simple_server(request):
+    """
+    Starts a server with a short client_timeout for each supported protocol,
+    returns the port it is listening on and the protocol name.
+    """
+    protocol = request.param
+    (server, port) = start_simple_server(client_timeout=200,
+                                         protocol=protocol)
+    yield (port, protocol)
+    server.close()
+    server.trans.close()
+
+
+def get_idle_sockets(client):
+    """
+    Return the sockets of the idle connections in the pool used by client.
+    """
+    pool = client._PooledClient__pool
+    return [conn[1] for (conn, _) in pool._ConnectionPool__idle]
+
+
+###############################################################################
+## tests
+
+def test_connection_reused(simple_server):
+    from gaas_client.gaas_thrift import create_client
+
+    (port, protocol) = simple_server
+    client = create_client("localhost", port, protocol=protocol)
+    idle_sockets = get_idle_sockets(client)
+    assert len(idle_sockets) == 1
+
+    assert client.uptime() == 42
+    assert client.uptime() == 42
+    assert get_idle_sockets(client) == idle_sockets
+
+
+def test_connection_closed_by_server_replaced(simple_server, caplog):
+    from gaas_client.gaas_thrift import create_client
+
+    (port, protocol) = simple_server
+    client = create_client("localhost", port, protocol=protocol)
+    assert client.uptime() == 42
+    idle_sockets = get_idle_sockets(client)
+
+    # Wait for the server to close the idle connection
+    time.sleep(0.5)
+
+    assert client.uptime() == 42
+    new_idle_sockets = get_idle_sockets(client)
+    assert len(new_idle_sockets) == 1
+    assert new_idle_sockets != idle_sockets
+
+    # The server closes idle connections without logging errors
+    assert [r for r in caplog.records if r.levelname == "ERROR"] == []
+
+
+def test_gaas_error_keeps_connection(simple_server):
+    from gaas_client.gaas_thrift import create_client
+    from gaas_client.exceptions import GaasError
+
+    (port, protocol) = simple_server
+    client = create_client("localhost", port, protocol=protocol)
+    idle_sockets = get_idle_sockets(client)
+
+    with pytest.raises(GaasError):
+        client.delete_graph(99)
+    assert get_idle_sockets(client) == idle_sockets
+    assert client.uptime() == 42
+    assert get_idle_sockets(client) == idle_sockets
+
+
+def test_idle_connections_closed(simple_server):
+    from gaas_client.gaas_thrift import create_client
+
+    (port, protocol) = simple_server
+    client = create_client("localhost", port, protocol=protocol,
+                           idle_timeout=100)
+    assert len(get_idle_sockets(client)) == 1
+
+    # The idle connection is closed without using the pool again
+    time.sleep(0.3)
+    assert get_idle_sockets(client) == []
+
+
+def test_graph_data_payloads(simple_server):
+    from gaas_client.gaas_thrift import create_client
+    from gaas_client.types import (
+        GraphVertexEdgeID,
+        Value,
+        ndarray_from_bytes,
+    )
+
+    (port, protocol) = simple_server
+    client = create_client("localhost", port, protocol=protocol)
+
+    payload = client.get_graph_vertex_data(GraphVertexEdgeID(int32_id=0),
+                                           Value(int32_value=0), 0, [])
+    np_array = ndarray_from_bytes(payload)
+    assert np_array.dtype == vertex_data.dtype
+    assert (np_array == vertex_data).all()
+
+    payload = client.get_graph_edge_data(GraphVertexEdgeID(int32_id=0),
+                                         Value(int32_value=0), 0, [])
+    np_array = ndarray_from_bytes(payload)
+    assert np_array.shape == edge_data.shape
+    assert np_array.tolist() == edge_data.tolist()
+
+
+def test_algo_result_payloads(simple_server):
+    from gaas_client.gaas_thrift import create_client
+    from gaas_client.types import ndarray_from_bytes
+
+    (port, protocol) = simple_server
+    client = create_client("localhost", port, protocol=protocol)
+
+    result = client.node2vec([0], 2, 0)
+    for (field_name, expected) in [("vertex_paths", vertex_paths),
+                                   ("edge_weights", edge_weights),
+                                   ("path_sizes", path_sizes)]:
+        np_array = ndarray_from_bytes(getattr(result, field_name))
+        assert np_array.dtype == expected.dtype
+        assert (np_array == expected).all()
@@ -14,8 +14,6 @@
 
 import os
 from pathlib import Path
-import pickle
-
 import pytest
 
 from . import data
@@ -88,6 +86,8 @@ def test_get_graph_data_large_vertex_ids(
     """
     Test that graphs with large vertex ID values (>int32) are handled.
     """
+    from gaas_client.types import ndarray_from_bytes
+
     handler = mg_handler
     extension_dir = graph_creation_extension_big_vertex_ids
 
@@ -103,7 +103,7 @@ def test_get_graph_data_large_vertex_ids(
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(vert_data)) == 0
+    assert len(ndarray_from_bytes(vert_data)) == 0
 
     large_vert_id = (2**32)+1
     vert_data = handler.get_graph_vertex_data(
@@ -112,7 +112,7 @@ def test_get_graph_data_large_vertex_ids(
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(vert_data)) == 1
+    assert len(ndarray_from_bytes(vert_data)) == 1
 
     invalid_edge_id = (2**32)+1
     edge_data = handler.get_graph_edge_data(
@@ -121,7 +121,7 @@ def test_get_graph_data_large_vertex_ids(
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(edge_data)) == 0
+    assert len(ndarray_from_bytes(edge_data)) == 0
 
     small_edge_id = 2
     edge_data = handler.get_graph_edge_data(
@@ -130,7 +130,7 @@ def test_get_graph_data_large_vertex_ids(
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(edge_data)) == 1
+    assert len(ndarray_from_bytes(edge_data)) == 1
 
 
 # FIXME: consolidate this with the SG version of this test.
@@ -141,6 +141,8 @@ def test_get_graph_data_empty_graph(
     """
     Tests that get_graph_*_data() handles empty graphs correctly.
     """
+    from gaas_client.types import ndarray_from_bytes
+
     handler = mg_handler
     extension_dir = graph_creation_extension_empty_graph
 
@@ -156,7 +158,7 @@ def test_get_graph_data_empty_graph(
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(vert_data)) == 0
+    assert len(ndarray_from_bytes(vert_data)) == 0
 
     invalid_edge_id = 2
     edge_data = handler.get_graph_edge_data(
@@ -165,11 +167,12 @@ def test_get_graph_data_empty_graph(
         graph_id=new_graph_id,
         property_keys=None)
 
-    assert len(pickle.loads(edge_data)) == 0
+    assert len(ndarray_from_bytes(edge_data)) == 0
 
 
 def test_get_edge_IDs_for_vertices(handler_with_karate_edgelist_loaded):
     from gaas_client import defaults
+    from gaas_client.exceptions import GaasError
 
     (handler, test_data) = handler_with_karate_edgelist_loaded
 
@@ -192,6 +195,117 @@ def test_get_edge_IDs_for_vertices(handler_with_karate_edgelist_loaded):
                                              extracted_graph_id)
     assert eIDs == [0, 1, 2]
 
+    # The first call queries the edge data, karate is small enough for the
+    # second call to build a (src, dst):edge ID lookup dictionary for the
+    # graph. Ensure the dictionary returns the edge IDs in the order of the
+    # vertex ID pairs passed in, both when built and once cached.
+    eIDs = handler.get_edge_IDs_for_vertices([2, 1, 3],
+                                             [0, 0, 0],
+                                             extracted_graph_id)
+    assert eIDs == [1, 0, 2]
+
+    eIDs = handler.get_edge_IDs_for_vertices([3, 2, 1],
+                                             [0, 0, 0],
+                                             extracted_graph_id)
+    assert eIDs == [2, 1, 0]
+
+    # (0, 0) is not an edge in karate
+    with pytest.raises(GaasError):
+        handler.get_edge_IDs_for_vertices([1, 0],
+                                          [0, 0],
+                                          extracted_graph_id)
+
+
+def test_get_edge_IDs_for_vertices_lookups_bounded(
+        handler_with_karate_edgelist_loaded, monkeypatch):
+    """
+    Ensure the least recently used edge ID lookup dictionaries are discarded
+    when the dictionaries for all graphs exceed the total size allowed.
+    """
+    from gaas_client import defaults
+    from gaas_server.gaas_handler import GaasHandler
+
+    (handler, test_data) = handler_with_karate_edgelist_loaded
+
+    # Only the dictionary for one karate graph (156 edges) fits
+    monkeypatch.setattr(GaasHandler,
+                        "_GaasHandler__edge_ID_lookups_max_total_edges",
+                        200)
+
+    extracted_graph_ids = [
+        handler.extract_subgraph(create_using=None,
+                                 selection=None,
+                                 edge_weight_property=None,
+                                 default_edge_weight=1.0,
+                                 allow_multi_edges=True,
+                                 renumber_graph=True,
+                                 add_edge_data=True,
+                                 graph_id=defaults.graph_id)
+        for _ in range(2)]
+    edge_ID_lookups = handler._GaasHandler__edge_ID_lookups
+
+    for extracted_graph_id in extracted_graph_ids:
+        for _ in range(2):
+            eIDs = handler.get_edge_IDs_for_vertices([1, 2, 3],
+                                                     [0, 0, 0],
+                                                     extracted_graph_id)
+            assert eIDs == [0, 1, 2]
+    assert list(edge_ID_lookups) == [extracted_graph_ids[1]]
+
+    # The discarded dictionary is rebuilt on the next call
+    eIDs = handler.get_edge_IDs_for_vertices([2, 1, 3],
+                                             [0, 0, 0],
+                                             extracted_graph_ids[0])
+    assert eIDs == [1, 0, 2]
+    assert list(edge_ID_lookups) == [extracted_graph_ids[0]]
+
+    handler.delete_graph(extracted_graph_ids[0])
+    assert list(edge_ID_lookups) == []
+
+
+def test_get_edge_IDs_for_vertices_from_edge_data(
+        handler_with_karate_edgelist_loaded, monkeypatch):
+    """
+    Ensure the edge IDs are found from the graph's edge data when the graph
+    is too large for a lookup dictionary.
+    """
+    from gaas_client import defaults
+    from gaas_client.exceptions import GaasError
+    from gaas_server.gaas_handler import GaasHandler
+
+    (handler, test_data) = handler_with_karate_edgelist_loaded
+
+    monkeypatch.setattr(GaasHandler,
+                        "_GaasHandler__edge_ID_lookup_max_edges",
+                        0)
+
+    extracted_graph_id = handler.extract_subgraph(create_using=None,
+                                                  selection=None,
+                                                  edge_weight_property=None,
+                                                  default_edge_weight=1.0,
+                                                  allow_multi_edges=True,
+                                                  renumber_graph=True,
+                                                  add_edge_data=True,
+                                                  graph_id=defaults.graph_id)
+
+    # FIXME: this assumes these are always the first 3 edges in karate, which
+    # may not be a safe assumption.
+    eIDs = handler.get_edge_IDs_for_vertices([1, 2, 3],
+                                             [0, 0, 0],
+                                             extracted_graph_id)
+    assert eIDs == [0, 1, 2]
+
+    eIDs = handler.get_edge_IDs_for_vertices([2, 1, 3],
+                                             [0, 0, 0],
+                                             extracted_graph_id)
+    assert eIDs == [1, 0, 2]
+
+    # (0, 0) is not an edge in karate
+    with pytest.raises(GaasError):
+        handler.get_edge_IDs_for_vertices([1, 0],
+                                          [0, 0],
+                                          extracted_graph_id)
+
 
 def test_get_graph_info(handler_with_karate_edgelist_loaded):
     """
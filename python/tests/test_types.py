@@ -0,0 +1,152 @@
+# Copyright (c) 2022, NVIDIA CORPORATION.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+
+###############################################################################
+## fixtures
+
+def roundtrip(array):
+    """
+    Serialize array and restore it from the bytes a client would receive.
+    """
+    from gaas_client.types import ndarray_to_bytes, ndarray_from_bytes
+
+    return ndarray_from_bytes(bytes(ndarray_to_bytes(array)))
+
+
+###############################################################################
+## tests
+
+@pytest.mark.parametrize("array", [
+    np.arange(12, dtype="int32").reshape(3, 4),
+    np.arange(5, dtype="float64"),
+    np.array([True, False]),
+    np.array([1+2j], dtype="complex128"),
+    np.zeros((0, 0)),
+    np.zeros((3, 0), dtype="int64"),
+    np.array(3.5),
+    np.arange(12, dtype="int64").reshape(3, 4).T,
+    np.arange(10, dtype="int16")[::3],
+    np.arange(3).astype("datetime64[s]"),
+    np.arange(3).astype("timedelta64[ms]"),
+    np.array(["a", "bcd"]),
+    np.array([b"a", b"bcd"]),
+    np.arange(4, dtype=">i4"),
+    np.arange(4, dtype=">f8"),
+], ids=lambda array: f"{array.dtype.str}{array.shape}")
+def test_ndarray_raw_payload(array):
+    from gaas_client.types import ndarray_to_bytes
+
+    payload = ndarray_to_bytes(array)
+    assert payload[0] == 0  # raw format
+
+    restored = roundtrip(array)
+    assert restored.dtype == array.dtype
+    assert restored.shape == array.shape
+    assert (restored == array).all()
+
+
+def test_ndarray_pickle_payload():
+    from gaas_client.types import ndarray_to_bytes
+
+    array = np.array([[1, "a"], [2, None]], dtype=object)
+    payload = ndarray_to_bytes(array)
+    assert isinstance(payload, bytes)
+    assert payload[0] == 1  # pickle format
+
+    restored = roundtrip(array)
+    assert restored.dtype == array.dtype
+    assert restored.tolist() == array.tolist()
+
+
+def test_ndarray_from_bytes_read_only():
+    from gaas_client.types import ndarray_to_bytes, ndarray_from_bytes
+
+    payload = bytes(ndarray_to_bytes(np.arange(4)))
+    restored = ndarray_from_bytes(payload)
+    assert not restored.flags.writeable
+    with pytest.raises(ValueError):
+        restored[0] = 1
+
+
+def test_ndarray_header():
+    from gaas_client.types import ndarray_header, ndarray_from_bytes
+
+    # A header followed by raw data, as written by the server for device
+    # arrays, is restored the same as an ndarray_to_bytes() payload.
+    array = np.arange(6, dtype="uint8").reshape(2, 3)
+    payload = ndarray_header(array.dtype, array.shape) + array.tobytes()
+    restored = ndarray_from_bytes(payload)
+    assert restored.dtype == array.dtype
+    assert (restored == array).all()
+
+
+@pytest.mark.parametrize("val,member", [
+    (0, "int32_value"),
+    (-2**31, "int32_value"),
+    (2**31 - 1, "int32_value"),
+    (2**31, "int64_value"),
+    (-2**31 - 1, "int64_value"),
+    (np.int64(2**40), "int64_value"),
+])
+def test_make_int_union(val, member):
+    from gaas_client.types import make_int_union
+
+    union = make_int_union(val)
+    assert getattr(union, member) == val
+    assert isinstance(getattr(union, member), int)
+
+
+def test_value_wrapper():
+    from gaas_client.types import Value, ValueWrapper
+
+    assert ValueWrapper(3).get_py_obj() == 3
+    assert ValueWrapper(3).union == Value(int32_value=3)
+    assert ValueWrapper(2**40).union == Value(int64_value=2**40)
+    assert ValueWrapper("a").get_py_obj() == "a"
+    assert ValueWrapper(np.int32(7)).get_py_obj() == 7
+    assert type(ValueWrapper(np.int64(7)).get_py_obj()) is int
+
+    # Wrapping a received union finds the member that is set
+    assert ValueWrapper(Value(string_value="s")).get_py_obj() == "s"
+    assert ValueWrapper(Value(int64_value=5)).get_py_obj() == 5
+    assert ValueWrapper(Value()).get_py_obj() is None
+
+    with pytest.raises(TypeError):
+        ValueWrapper(1.5)
+
+    # __slots__ means no per-instance __dict__
+    with pytest.raises(AttributeError):
+        ValueWrapper(1).other = 1
+
+
+def test_graph_vertex_edge_id_wrapper():
+    from gaas_client.types import GraphVertexEdgeID, GraphVertexEdgeIDWrapper
+
+    assert GraphVertexEdgeIDWrapper(3).union == GraphVertexEdgeID(int32_id=3)
+    assert GraphVertexEdgeIDWrapper(2**40).union == \
+        GraphVertexEdgeID(int64_id=2**40)
+    assert GraphVertexEdgeIDWrapper([1, 2]).get_py_obj() == [1, 2]
+
+    union = GraphVertexEdgeID(int64_ids=[2**40])
+    assert GraphVertexEdgeIDWrapper(union).get_py_obj() == [2**40]
+
+    with pytest.raises(TypeError):
+        GraphVertexEdgeIDWrapper("1")
+
+    with pytest.raises(AttributeError):
+        GraphVertexEdgeIDWrapper(1).other = 1